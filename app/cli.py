@@ -10,5 +10,115 @@ def migrate():
     asyncio.run(run_migrations())
     print("Migrations completed successfully!")
 
+@cli.command("set-role")
+def set_role(
+    user_id: str = typer.Argument(..., help="Auth user id"),
+    role: str = typer.Argument(..., help="admin or farmer"),
+):
+    """Grant a role, e.g. to create the first admin (later admins can use PUT /users/{id}/role)."""
+    import asyncio
+    from app.services.user_service import set_user_role
+    if role not in ("admin", "farmer"):
+        raise typer.BadParameter("role must be admin or farmer")
+    result = asyncio.run(set_user_role(user_id, role))
+    if not result["success"]:
+        print(f"Failed: {result['error']}")
+        raise typer.Exit(1)
+    print(f"User {user_id} is now {role}")
+
+@cli.command()
+def previews(batch_size: int = typer.Option(50, help="Results fetched per batch")):
+    """Generate thumbnails and thermal previews for results that don't have them."""
+    import asyncio
+    from app.services.preview_service import backfill_result_previews, shutdown_executor
+    try:
+        summary = asyncio.run(backfill_result_previews(batch_size=batch_size))
+    finally:
+        shutdown_executor()
+    print(f"Previews generated: {summary['processed']} ok, {summary['failed']} failed")
+
+@cli.command("refuse")
+def refuse(
+    batch_size: int = typer.Option(500, help="Results fetched per batch"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report changes without writing them"),
+):
+    """Recompute fused confidence/decision for all stored results with the current fusion settings."""
+    import asyncio
+    from app.services.fusion_service import refuse_all_results
+    summary = asyncio.run(refuse_all_results(batch_size=batch_size, dry_run=dry_run))
+    verb = "would change" if dry_run else "changed"
+    print(f"Scanned {summary['scanned']} results, {verb} {summary['changed']}, decisions flipped: {summary['flipped']}")
+    if summary["skipped"]:
+        print(f"Skipped {summary['skipped']} results with an unparseable model output")
+    for transition, count in sorted(summary["flips"].items()):
+        print(f"  {transition}: {count}")
+
+@cli.command("replica-sync")
+def replica_sync(
+    full: bool = typer.Option(False, "--full", help="Rebuild the replica from scratch (picks up remote updates and deletes)"),
+    retry_dead: bool = typer.Option(False, "--retry-dead", help="Requeue rows set aside after Supabase rejected them"),
+):
+    """Push queued local results upstream and pull new rows into the local SQLite replica."""
+    import asyncio
+    from app.services.replica_service import replica
+
+    async def run():
+        if retry_dead:
+            print(f"Requeued {await replica.requeue_dead()} rejected rows")
+        if full:
+            await replica.reset()
+        return await replica.sync_once()
+
+    summary = asyncio.run(run())
+    print(f"Pushed {summary['pushed']} queued rows; pulled " + ", ".join(
+        f"{count} {table}" for table, count in summary.items() if table != "pushed"
+    ))
+
+@cli.command("bench-compression")
+def bench_compression(
+    rows: str = typer.Option("10,100,1000", help="Comma-separated list sizes to benchmark"),
+    link_kbps: float = typer.Option(384.0, help="Client link speed used to estimate transfer time"),
+    file: str = typer.Option(None, help="Benchmark a saved response body instead of synthetic rows"),
+):
+    """Compare response sizes and time saved for gzip / brotli on inference result payloads."""
+    import json
+    import random
+    import uuid
+    from datetime import datetime, timedelta, timezone
+    from app.core.compression import benchmark, brotli
+
+    def synthetic_rows(count):
+        started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        items = []
+        for i in range(count):
+            p = random.random()
+            items.append({
+                "id": str(uuid.uuid4()),
+                "created_at": (started + timedelta(minutes=7 * i)).isoformat(),
+                "regular_result": [{"label": "infected" if p >= 0.5 else "healthy", "confidence": round(p, 4),
+                                    "bbox": [random.randint(0, 640) for _ in range(4)]}],
+                "thermal_result": {"label": "infected", "confidence": round(random.random(), 4),
+                                   "max_temp_c": round(random.uniform(24, 38), 2)},
+                "fused_confidence": round(random.random(), 4),
+                "fusion_decision": "infected" if p >= 0.5 else "healthy",
+                "regular_output_url": f"https://example.supabase.co/storage/v1/object/public/outputs/{uuid.uuid4()}.jpg",
+                "thermal_output_url": f"https://example.supabase.co/storage/v1/object/public/outputs/{uuid.uuid4()}.jpg",
+            })
+        return {"has_error": False, "data": items, "error": None}
+
+    if file:
+        with open(file, "rb") as fh:
+            payloads = [(file, fh.read())]
+    else:
+        payloads = [(f"{n} rows", json.dumps(synthetic_rows(int(n))).encode()) for n in rows.split(",")]
+
+    if brotli is None:
+        print("brotli not installed; benchmarking gzip only")
+    print(f"{'payload':>12} {'encoding':>9} {'bytes':>10} {'ratio':>6} {'cpu ms':>8} {'xfer ms':>9} {'saved ms':>9}")
+    for label, body in payloads:
+        for encoding, stats in benchmark(body, link_kbps).items():
+            print(f"{label:>12} {encoding:>9} {stats['bytes']:>10} {stats['ratio']:>6.2f} "
+                  f"{stats['compress_ms']:>8.2f} {stats['transfer_ms']:>9.1f} {stats['saved_ms']:>9.1f}")
+
 if __name__ == "__main__":
     cli() 
\ No newline at end of file
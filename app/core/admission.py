@@ -0,0 +1,255 @@
+import asyncio
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import jwt
+
+from app.core.cache import MemoryCache
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger('admission')
+
+# Paths that are never limited: probes must answer under load and the SSE stream
+# would hold a concurrency slot for as long as the dashboard stays open.
+EXEMPT_SUFFIXES = ("/health/live", "/health/ready", "/inference-results/stream")
+
+AUTH_SUFFIXES = ("/login", "/refresh", "/register")
+UPLOAD_SUFFIXES = ("/scans/upload",)
+
+
+class Shed(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """
+    Per-client token buckets: `rate` tokens per second refill up to `burst`.
+    Idle buckets expire, so memory is bounded by `max_clients` active clients.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000) -> None:
+        self.rate = rate
+        self.burst = burst
+        # A bucket idle for this long has refilled completely and can be dropped.
+        # Always in-process: a shared backend would add a write per request.
+        self._buckets = MemoryCache(ttl=burst / rate if rate > 0 else 0, max_entries=max_clients)
+
+    def acquire(self, client: str) -> float:
+        """Take a token; returns 0.0 on success or the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens < 1.0:
+            self._buckets.set(client, (tokens, now))
+            return (1.0 - tokens) / self.rate
+        self._buckets.set(client, (tokens - 1.0, now))
+        return 0.0
+
+
+class ConcurrencyLimiter:
+    """
+    At most `limit` requests in flight. Up to `max_queue` more wait up to
+    `queue_timeout` seconds for a slot; anything beyond that is rejected at once.
+    """
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float) -> None:
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the time spent queued, or raise Shed."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.shed += 1
+            raise Shed(503, "Server busy, try again shortly", self.queue_timeout)
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed += 1
+            raise Shed(503, "Server busy, try again shortly", self.queue_timeout)
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return time.perf_counter() - started
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": self.waiting, "shed": self.shed}
+
+
+@dataclass
+class RouteGroup:
+    name: str
+    concurrency: ConcurrencyLimiter
+    rate: TokenBucketLimiter
+    # Expensive unauthenticated endpoints are always limited per IP, never per claimed user
+    key_by_user: bool = True
+
+
+def _client_ip(scope: Dict[str, Any]) -> str:
+    if settings.ADMISSION_TRUST_PROXY_HEADERS:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user_id(scope: Dict[str, Any]) -> Optional[str]:
+    """
+    Subject of the caller's access token if its signature checks out against
+    SUPABASE_JWT_SECRET (HS256, microseconds per request). Without the secret,
+    or for an invalid token, returns None and the caller is limited per IP:
+    several routes don't require auth, so an unverified sub would let a client
+    mint a fresh bucket for every request.
+    """
+    if not settings.SUPABASE_JWT_SECRET:
+        return None
+    token = None
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            token = value[7:].decode("latin-1")
+            break
+        if name == b"cookie" and token is None:
+            for part in value.decode("latin-1").split(";"):
+                key, _, cookie = part.strip().partition("=")
+                if key == "access_token":
+                    token = cookie
+    if not token:
+        return None
+    try:
+        return jwt.decode(
+            token, settings.SUPABASE_JWT_SECRET, algorithms=["HS256"], audience="authenticated"
+        ).get("sub")
+    except jwt.PyJWTError:
+        return None
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that sheds excess load before it reaches a route handler.
+
+    Requests are sorted into route groups (auth, uploads, default), each with its
+    own concurrency cap and per-client token bucket, so a login storm can only
+    exhaust the auth group and the dashboard keeps its own capacity. Rejections are
+    immediate 429 (rate) or 503 (capacity) responses with Retry-After; admitted
+    requests report their queue wait in a Server-Timing header.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        queue_timeout = settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        max_queue = settings.ADMISSION_MAX_QUEUE
+        self.groups = {
+            "auth": RouteGroup(
+                "auth",
+                ConcurrencyLimiter(settings.ADMISSION_AUTH_CONCURRENCY, max_queue, queue_timeout),
+                TokenBucketLimiter(settings.ADMISSION_AUTH_RATE_PER_MINUTE / 60, settings.ADMISSION_AUTH_BURST),
+                key_by_user=False,
+            ),
+            "uploads": RouteGroup(
+                "uploads",
+                ConcurrencyLimiter(settings.ADMISSION_UPLOAD_CONCURRENCY, max_queue, queue_timeout),
+                TokenBucketLimiter(settings.ADMISSION_DEFAULT_RATE_PER_MINUTE / 60, settings.ADMISSION_DEFAULT_BURST),
+            ),
+            "default": RouteGroup(
+                "default",
+                ConcurrencyLimiter(settings.ADMISSION_DEFAULT_CONCURRENCY, max_queue, queue_timeout),
+                TokenBucketLimiter(settings.ADMISSION_DEFAULT_RATE_PER_MINUTE / 60, settings.ADMISSION_DEFAULT_BURST),
+            ),
+        }
+        admission.middleware = self
+
+    def _group_for(self, scope: Dict[str, Any]) -> Optional[RouteGroup]:
+        path = scope["path"].rstrip("/")
+        if scope["method"] == "OPTIONS" or not path or path.endswith(EXEMPT_SUFFIXES):
+            return None
+        if scope["method"] == "POST" and path.endswith(AUTH_SUFFIXES):
+            return self.groups["auth"]
+        if path.endswith(UPLOAD_SUFFIXES):
+            return self.groups["uploads"]
+        return self.groups["default"]
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        group = self._group_for(scope)
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = _user_id(scope) if group.key_by_user else None
+        client = f"user:{user_id}" if user_id else f"ip:{_client_ip(scope)}"
+        wait = group.rate.acquire(client)
+        if wait > 0:
+            logger.warning(f"Rate limited {client} on {group.name} group ({scope['path']})")
+            await self._reject(send, Shed(429, "Too many requests", wait))
+            return
+        try:
+            queued = await group.concurrency.acquire()
+        except Shed as shed:
+            logger.warning(f"Shed request to {scope['path']}: {group.name} group at capacity")
+            await self._reject(send, shed)
+            return
+
+        timing = f'queue;dur={queued * 1000:.1f};desc="{group.name}"'.encode("latin-1")
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            group.concurrency.release()
+
+    async def _reject(self, send: Any, shed: Shed) -> None:
+        body = json.dumps({"detail": shed.detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": shed.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(shed.retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class _AdmissionState:
+    """Handle on the live middleware instance for health reporting."""
+
+    middleware: Optional[AdmissionControlMiddleware] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.middleware is None or not settings.ADMISSION_ENABLED:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "groups": {name: group.concurrency.snapshot() for name, group in self.middleware.groups.items()},
+        }
+
+
+admission = _AdmissionState()
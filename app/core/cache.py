@@ -0,0 +1,211 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger('cache')
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    Key/value cache with per-entry expiry and a size limit. `ttl` is the default
+    lifetime in seconds; `set` can override it per entry.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process cache with LRU eviction once `max_entries` is reached. Fastest
+    option, but each worker process holds its own copy.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000) -> None:
+        super().__init__(ttl, max_entries)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a SQLite database in WAL mode, shared by every worker
+    process on the host. Readers never block writers, and a lookup is one indexed
+    read on a local file.
+
+    Each cache is a `namespace` within the shared file. Values are stored as JSON,
+    so keys and values must be JSON-serialisable. Expired rows are ignored on read
+    and purged, together with the entries closest to expiry beyond `max_entries`,
+    on roughly one write in PRUNE_EVERY.
+
+    Calls run on the event loop, so they wait at most CACHE_SQLITE_BUSY_TIMEOUT_SECONDS
+    for a lock held by another process. A read that can't get one is a miss and
+    a write is dropped; either way the caller falls back to Supabase.
+    """
+
+    PRUNE_EVERY = 100
+
+    _init_lock = threading.Lock()
+    _initialized_paths = set()
+
+    def __init__(self, path: str, namespace: str, ttl: float, max_entries: int = 10000) -> None:
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self.namespace = namespace
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads or across a fork;
+        # keep one per thread and reopen it in a forked worker
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=settings.CACHE_SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with self._init_lock:
+            if self.path in self._initialized_paths:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Created once per process at import time, so waiting out a busy writer is fine here
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (namespace, expires_at)")
+            conn.close()
+            self._initialized_paths.add(self.path)
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return key if isinstance(key, str) else json.dumps(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, self._key(key))
+            ).fetchone()
+        except sqlite3.OperationalError as exc:
+            logger.debug(f"Cache {self.namespace} read skipped: {exc}")
+            return default
+        if row is None or row[1] <= time.time():
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, self._key(key), json.dumps(value), expires_at)
+            )
+            if random.randrange(self.PRUNE_EVERY) == 0:
+                self._prune(conn)
+        except sqlite3.OperationalError as exc:
+            logger.debug(f"Cache {self.namespace} write skipped: {exc}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time()))
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            self._connection().execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, self._key(key))
+            )
+        except sqlite3.OperationalError as exc:
+            # The entry is left to expire: stale for at most its ttl
+            logger.warning(f"Cache {self.namespace} invalidation skipped: {exc}")
+
+    def clear(self) -> None:
+        try:
+            self._connection().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        except sqlite3.OperationalError as exc:
+            logger.warning(f"Cache {self.namespace} invalidation skipped: {exc}")
+
+
+def get_cache(namespace: str, ttl: float, max_entries: Optional[int] = None) -> CacheBackend:
+    """
+    Cache for `namespace` on the backend selected by CACHE_BACKEND: "memory" (per
+    process) or "sqlite" (shared by all workers on the host via CACHE_SQLITE_PATH).
+    """
+    max_entries = max_entries or settings.CACHE_MAX_ENTRIES
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteCache(settings.CACHE_SQLITE_PATH, namespace, ttl, max_entries)
+    if settings.CACHE_BACKEND != "memory":
+        logger.warning(f"Unknown CACHE_BACKEND {settings.CACHE_BACKEND!r}, using memory")
+    return MemoryCache(ttl, max_entries)
@@ -0,0 +1,195 @@
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Only text-like payloads shrink enough to be worth the CPU
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml", "image/svg+xml")
+# Streams where the client needs every event as soon as it is written
+EXCLUDED_TYPES = ("text/event-stream",)
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    encodings: Dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            encodings[coding.strip().lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, preferring br on a q-value tie."""
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_q:
+            best, best_q = coding, quality
+    return best
+
+
+class Compressor:
+    """Incremental gzip / brotli encoder with one interface."""
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits 16 + MAX_WBITS writes a gzip header and trailer
+            self._zlib = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+def compress_body(encoding: str, body: bytes) -> bytes:
+    compressor = Compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    return next((value for key, value in headers if key.lower() == name), None)
+
+
+def _is_compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+    if _header(headers, b"content-encoding") is not None:
+        return False
+    content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+    if content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+
+class CompressionMiddleware:
+    """
+    Negotiated br / gzip response compression.
+
+    Bodies under COMPRESSION_MIN_SIZE are sent as-is. A body that arrives in one
+    message is compressed at once and gets an accurate Content-Length.
+    Streaming responses are compressed chunk by chunk with chunked transfer, so
+    a large export never has to be buffered whole. Server-sent events and
+    responses that are already encoded pass through untouched.
+    """
+
+    def __init__(self, app: Any, minimum_size: Optional[int] = None) -> None:
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope.get("headers", []), b"accept-encoding")
+        encoding = negotiate_encoding(accept.decode("latin-1")) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Any, encoding: str, minimum_size: int) -> None:
+        self._send = send
+        self._encoding = encoding
+        self._minimum_size = minimum_size
+        self._start: Optional[Dict[str, Any]] = None
+        self._compressor: Optional[Compressor] = None
+        self._passthrough = False
+
+    def _encoded_start(self, content_length: Optional[int]) -> Dict[str, Any]:
+        headers = [
+            (key, value) for key, value in self._start["headers"]
+            if key.lower() not in (b"content-length", b"vary")
+        ]
+        vary = _header(self._start["headers"], b"vary")
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        headers.append((b"content-encoding", self._encoding.encode()))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return {**self._start, "headers": headers}
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            self._start = {**message, "headers": list(message.get("headers", []))}
+            self._passthrough = not _is_compressible(self._start["headers"])
+            if self._passthrough:
+                await self._send(self._start)
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self._compressor is None:
+            declared = _header(self._start["headers"], b"content-length")
+            # Streams without a Content-Length have unknown size and are always compressed
+            size = int(declared) if declared is not None else (None if more_body else len(body))
+            if size is not None and size < self._minimum_size:
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+            if not more_body:
+                compressed = compress_body(self._encoding, body)
+                await self._send(self._encoded_start(len(compressed)))
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+            self._compressor = Compressor(self._encoding)
+            await self._send(self._encoded_start(None))
+
+        chunk = self._compressor.compress(body)
+        if not more_body:
+            chunk += self._compressor.finish()
+        if chunk or not more_body:
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+def benchmark(body: bytes, link_kbps: float, rounds: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Size and timing of each available encoding for `body`. `saved_ms` is the
+    transfer time saved on a `link_kbps` link minus the time spent compressing.
+    """
+    import time
+
+    transfer_ms = lambda size: size * 8 / link_kbps  # bits / (kbit/s) = ms
+    report = {"identity": {"bytes": len(body), "ratio": 1.0, "compress_ms": 0.0,
+                           "transfer_ms": transfer_ms(len(body)), "saved_ms": 0.0}}
+    for encoding in (["br"] if brotli is not None else []) + ["gzip"]:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            compressed = compress_body(encoding, body)
+        compress_ms = (time.perf_counter() - started) * 1000 / rounds
+        report[encoding] = {
+            "bytes": len(compressed),
+            "ratio": len(compressed) / len(body) if body else 1.0,
+            "compress_ms": compress_ms,
+            "transfer_ms": transfer_ms(len(compressed)),
+            "saved_ms": transfer_ms(len(body)) - transfer_ms(len(compressed)) - compress_ms,
+        }
+    return report
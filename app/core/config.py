@@ -19,6 +19,91 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str
     SUPABASE_SERVICE_KEY: str  # For admin operations
 
+    SUPABASE_JWT_SECRET: Optional[str] = None  # Enables local access-token verification
+
+    # Caches: "memory" (per worker process) or "sqlite" (shared by all workers on the host)
+    CACHE_BACKEND: str = "memory"
+    CACHE_SQLITE_PATH: str = "var/cache.db"
+    CACHE_SQLITE_BUSY_TIMEOUT_SECONDS: float = 0.05  # lock wait before a lookup counts as a miss
+    CACHE_MAX_ENTRIES: int = 10000  # per cache namespace
+    AUTH_TOKEN_CACHE_SECONDS: float = 60.0
+    AUTH_ROLE_CACHE_SECONDS: float = 60.0
+    DASHBOARD_STATS_CACHE_SECONDS: float = 30.0
+    USER_SEARCH_CACHE_SECONDS: float = 30.0
+
+    # Supabase resilience (deadlines, retries, circuit breaker)
+    SUPABASE_HTTP_TIMEOUT_SECONDS: float = 15.0
+    SUPABASE_READ_TIMEOUT_SECONDS: float = 5.0
+    SUPABASE_WRITE_TIMEOUT_SECONDS: float = 10.0
+    SUPABASE_READ_RETRIES: int = 2
+    SUPABASE_RETRY_BACKOFF_SECONDS: float = 0.2
+    SUPABASE_HEDGE_AFTER_SECONDS: float = 1.0
+    SUPABASE_BREAKER_FAILURE_THRESHOLD: int = 5
+    SUPABASE_BREAKER_RECOVERY_SECONDS: float = 30.0
+    SUPABASE_MAX_CONCURRENCY: int = 32
+
+    # Storage for uploaded scan images ("local" or "supabase")
+    STORAGE_BACKEND: str = "local"
+    STORAGE_LOCAL_ROOT: str = "uploads"
+    STORAGE_PUBLIC_URL: Optional[str] = None  # Base URL the local root is served from
+    SUPABASE_STORAGE_BUCKET: str = "scans"
+    UPLOAD_MAX_IMAGE_BYTES: int = 50 * 1024 * 1024
+
+    # Thumbnail / thermal preview generation
+    PREVIEW_WORKERS: int = 2
+    THUMBNAIL_SIZE: int = 256
+    THERMAL_PREVIEW_SIZE: int = 640
+
+    # Late fusion of regular + thermal model outputs
+    FUSION_REGULAR_WEIGHT: float = 0.5
+    FUSION_THERMAL_WEIGHT: float = 0.5
+    FUSION_THRESHOLD: float = 0.5  # P(infected) at or above this is "infected"
+
+    # Soil reading time series: raw rows the lttb method may load per request
+    SOIL_TIMESERIES_MAX_RAW_ROWS: int = 50000
+
+    # In-process background job queue
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 100
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 1.0
+    JOB_DRAIN_TIMEOUT_SECONDS: float = 30.0
+    JOB_STATUS_RETENTION_SECONDS: float = 86400.0  # how long job status stays queryable
+
+    # Live inference result feed (SSE)
+    FEED_POLL_INTERVAL_SECONDS: float = 2.0
+    FEED_CLIENT_BUFFER: int = 100
+    FEED_HEARTBEAT_SECONDS: float = 15.0
+    FEED_MAX_SUBSCRIBERS: int = 200
+    FEED_OVERLAP_SECONDS: float = 5.0  # re-read window behind the watermark for late commits
+
+    # Admission control: per route-group concurrency caps and per-client rate limits
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_AUTH_CONCURRENCY: int = 4  # login / refresh / register
+    ADMISSION_AUTH_RATE_PER_MINUTE: float = 20.0
+    ADMISSION_AUTH_BURST: int = 5
+    ADMISSION_UPLOAD_CONCURRENCY: int = 4
+    ADMISSION_DEFAULT_CONCURRENCY: int = 64
+    ADMISSION_DEFAULT_RATE_PER_MINUTE: float = 600.0
+    ADMISSION_DEFAULT_BURST: int = 60
+    ADMISSION_MAX_QUEUE: int = 32  # waiting requests per group before shedding
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_TRUST_PROXY_HEADERS: bool = False  # use X-Forwarded-For behind a reverse proxy
+
+    # Local SQLite replica of inference_results / scans for edge (offline) deployments
+    REPLICA_ENABLED: bool = False
+    REPLICA_SQLITE_PATH: str = "var/replica.db"
+    REPLICA_SYNC_INTERVAL_SECONDS: float = 30.0
+    REPLICA_PULL_BATCH_SIZE: int = 500
+    REPLICA_PUSH_BATCH_SIZE: int = 100
+    REPLICA_PULL_OVERLAP_SECONDS: float = 5.0  # re-read window behind the watermark for late commits
+
+    # Response compression (brotli is used when the optional package is installed)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; low levels suit dynamic responses
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,31 @@
+# Image transforms run inside the preview process pool. Keep this module free of
+# app imports (settings, Supabase clients): pool workers use the "spawn" start
+# method and import it fresh.
+from PIL import Image, ImageOps
+
+# Inferno-like ramp: cold -> dark purple, mid -> red, hot -> pale yellow
+THERMAL_COLORS = {"black": "#000004", "mid": "#bc3754", "white": "#fcffa4"}
+
+
+def _load(src: str, size: int) -> Image.Image:
+    with Image.open(src) as image:
+        # Lets the JPEG decoder downscale while decoding instead of materialising full resolution
+        image.draft("RGB", (size, size))
+        return ImageOps.exif_transpose(image)
+
+
+def render_thumbnail(src: str, dst: str, size: int) -> str:
+    """Write a size x size JPEG thumbnail of `src` (letterboxed, aspect ratio kept)."""
+    image = _load(src, size).convert("RGB")
+    thumb = ImageOps.pad(image, (size, size), method=Image.Resampling.LANCZOS)
+    thumb.save(dst, "JPEG", quality=85, optimize=True)
+    return dst
+
+
+def render_thermal_preview(src: str, dst: str, size: int) -> str:
+    """Write a false-colour JPEG preview of a thermal image, longest side `size`."""
+    gray = _load(src, size).convert("L")
+    gray.thumbnail((size, size), Image.Resampling.LANCZOS)
+    gray = ImageOps.autocontrast(gray, cutoff=1)
+    ImageOps.colorize(gray, **THERMAL_COLORS).save(dst, "JPEG", quality=85, optimize=True)
+    return dst
@@ -0,0 +1,223 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import httpx
+from postgrest.exceptions import APIError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger('db')
+
+T = TypeVar("T")
+
+
+class UpstreamError(Exception):
+    """Supabase is unhealthy; mapped to 503 by the app's exception handler."""
+
+
+class UpstreamUnavailableError(UpstreamError):
+    """Raised instead of calling Supabase while the circuit breaker is open."""
+
+
+class UpstreamTimeoutError(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive upstream
+    failures it opens and rejects calls for `recovery_timeout` seconds, then lets a
+    single probe call through (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_started_at = None
+        # A probe that never reported back (e.g. its request was cancelled) is replaced
+        probe_stale = self._probe_started_at is not None and now - self._probe_started_at >= self.recovery_timeout
+        if self.state == self.HALF_OPEN and (self._probe_started_at is None or probe_stale):
+            self._probe_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Supabase circuit breaker closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Supabase circuit breaker opened after {self.consecutive_failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started_at = None
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        if state == self.OPEN and self.retry_after() == 0.0:
+            state = self.HALF_OPEN
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 2),
+        }
+
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.SUPABASE_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.SUPABASE_BREAKER_RECOVERY_SECONDS,
+)
+
+# supabase-py's sync client blocks; calls run here so the event loop stays free.
+# A dedicated, bounded pool means calls abandoned at their deadline can't starve
+# asyncio.to_thread users elsewhere in the app.
+_executor = ThreadPoolExecutor(max_workers=settings.SUPABASE_MAX_CONCURRENCY, thread_name_prefix="supabase")
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """
+    True for errors that say Supabase itself is unhealthy (timeouts, transport
+    errors, HTTP 5xx). Client errors - bad credentials, constraint violations,
+    missing rows - are the caller's problem and must not trip the breaker.
+    """
+    if isinstance(exc, (UpstreamTimeoutError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if type(exc).__name__ == "AuthRetryableError":  # gotrue's wrapper for network errors
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    if isinstance(exc, APIError):
+        # An int code is the HTTP status of a non-JSON (gateway) error response;
+        # PGRST000-PGRST003 mean PostgREST couldn't reach the database. Any other
+        # string is a SQLSTATE ("23505", "42501", ...): the request reached the database.
+        if isinstance(exc.code, int):
+            return exc.code >= 500
+        return isinstance(exc.code, str) and exc.code.startswith("PGRST00")
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    return isinstance(status, int) and status >= 500
+
+
+async def _run(fn: Callable[[], T], timeout: float) -> T:
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(_executor, fn), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise UpstreamTimeoutError(f"Supabase call exceeded {timeout:.1f}s deadline")
+
+
+async def _run_hedged(fn: Callable[[], T], timeout: float, hedge_after: float) -> T:
+    """
+    Start `fn`; if it hasn't finished after `hedge_after` seconds, start a second
+    identical call and return whichever succeeds first. Only for idempotent reads.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    attempts = {asyncio.ensure_future(loop.run_in_executor(_executor, fn))}
+    done, _ = await asyncio.wait(attempts, timeout=min(hedge_after, timeout))
+    if not done:
+        attempts.add(asyncio.ensure_future(loop.run_in_executor(_executor, fn)))
+    last_error: Optional[BaseException] = None
+    pending = attempts
+    while pending:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            last_error = future.exception()
+    for future in pending:
+        future.cancel()
+    if last_error is not None and not pending:
+        raise last_error
+    raise UpstreamTimeoutError(f"Supabase call exceeded {timeout:.1f}s deadline")
+
+
+async def call_supabase(
+    operation: str,
+    fn: Callable[[], T],
+    *,
+    idempotent: bool = False,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Run a blocking supabase / supabase_admin call off the event loop with a deadline,
+    behind the circuit breaker. Idempotent reads are hedged and retried with
+    jittered exponential backoff; writes are attempted once.
+
+    Usage: await call_supabase("profiles.select", lambda: supabase.table("profiles").select("*").execute(), idempotent=True)
+    """
+    timeout = timeout or (settings.SUPABASE_READ_TIMEOUT_SECONDS if idempotent else settings.SUPABASE_WRITE_TIMEOUT_SECONDS)
+    attempts = 1 + (settings.SUPABASE_READ_RETRIES if idempotent else 0)
+    for attempt in range(1, attempts + 1):
+        if not breaker.allow():
+            raise UpstreamUnavailableError(
+                f"Supabase unavailable (circuit open), retry in {breaker.retry_after():.0f}s"
+            )
+        started = time.perf_counter()
+        try:
+            if idempotent:
+                result = await _run_hedged(fn, timeout, settings.SUPABASE_HEDGE_AFTER_SECONDS)
+            else:
+                result = await _run(fn, timeout)
+        except Exception as exc:
+            if not is_upstream_failure(exc):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            elapsed = time.perf_counter() - started
+            logger.warning(f"Supabase {operation} failed after {elapsed:.2f}s (attempt {attempt}/{attempts}): {exc}")
+            if attempt == attempts:
+                if isinstance(exc, UpstreamError):
+                    raise
+                raise UpstreamUnavailableError(f"Supabase {operation} failed: {exc}") from exc
+            backoff = settings.SUPABASE_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            await asyncio.sleep(random.uniform(0, backoff))
+        else:
+            breaker.record_success()
+            return result
+    raise UpstreamUnavailableError(f"Supabase {operation} failed")
+
+
+async def probe_upstream(fn: Callable[[], Any], timeout: float) -> Dict[str, Any]:
+    """Time a cheap upstream call for readiness checks. Bypasses the breaker and retries."""
+    started = time.perf_counter()
+    try:
+        await _run(fn, timeout)
+        ok, error = True, None
+    except Exception as exc:
+        ok, error = False, str(exc)
+    return {"ok": ok, "latency_ms": round((time.perf_counter() - started) * 1000, 1), "error": error}
@@ -0,0 +1,143 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+import jwt
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.resilience import call_supabase, UpstreamError
+from app.core.supabase import supabase, supabase_admin
+
+logger = get_logger('auth')
+
+# auto_error=False so the httponly access_token cookie set at login also works
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login", auto_error=False)
+
+# Upper bound for how long a deleted user's already-issued token can stay valid
+REVOKED_USER_TTL_SECONDS = 3600
+
+# With CACHE_BACKEND=sqlite these are shared, so a deletion handled by one worker
+# revokes the user's tokens in every worker on the host
+_token_cache = get_cache("auth.tokens", ttl=settings.AUTH_TOKEN_CACHE_SECONDS)
+_role_cache = get_cache("auth.roles", ttl=settings.AUTH_ROLE_CACHE_SECONDS)
+_revoked_users = get_cache("auth.revoked_users", ttl=REVOKED_USER_TTL_SECONDS)
+
+_NO_PROFILE = ""
+
+# The only role a user can obtain without an admin: self-registration and a bare
+# profile row grant this, anything more has to come from app_metadata
+SELF_SERVICE_ROLE = "farmer"
+
+
+@dataclass
+class Principal:
+    id: str
+    email: Optional[str]
+    role: str
+
+
+def _unauthorized(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Return the claims of a Supabase access token.
+
+    With SUPABASE_JWT_SECRET configured the signature is checked locally (no
+    upstream call). Otherwise the token is validated with auth.get_user once and
+    the result cached for a short TTL, never beyond the token's own expiry.
+    """
+    if settings.SUPABASE_JWT_SECRET:
+        try:
+            return jwt.decode(token, settings.SUPABASE_JWT_SECRET, algorithms=["HS256"], audience="authenticated")
+        except jwt.PyJWTError as exc:
+            raise _unauthorized(f"Invalid token: {exc}")
+
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    claims = _token_cache.get(cache_key)
+    if claims is not None:
+        return claims
+    try:
+        response = await call_supabase("auth.get_user", lambda: supabase.auth.get_user(token), idempotent=True)
+    except UpstreamError:
+        raise
+    except Exception:
+        raise _unauthorized()
+    if not response or not response.user:
+        raise _unauthorized()
+    claims = {
+        "sub": response.user.id,
+        "email": response.user.email,
+        "app_metadata": response.user.app_metadata or {},
+    }
+    try:
+        expires_in = jwt.decode(token, options={"verify_signature": False}).get("exp", 0) - time.time()
+    except jwt.PyJWTError:
+        expires_in = settings.AUTH_TOKEN_CACHE_SECONDS
+    if expires_in > 0:
+        _token_cache.set(cache_key, claims, ttl=min(settings.AUTH_TOKEN_CACHE_SECONDS, expires_in))
+    return claims
+
+
+async def get_profile_role(user_id: str) -> Optional[str]:
+    """Role from the profiles table, cached for AUTH_ROLE_CACHE_SECONDS (misses included)."""
+    role = _role_cache.get(user_id)
+    if role is not None:
+        return role or None
+    response = await call_supabase(
+        "profiles.role",
+        lambda: supabase_admin.table("profiles").select("role").eq("id", user_id).limit(1).execute(),
+        idempotent=True
+    )
+    role = response.data[0].get("role") if response.data else None
+    _role_cache.set(user_id, role or _NO_PROFILE)
+    return role
+
+
+def invalidate_user(user_id: str, deleted: bool = False) -> None:
+    """Drop cached role data for a user; `deleted` also rejects their outstanding tokens."""
+    _role_cache.delete(user_id)
+    if deleted:
+        _revoked_users.set(user_id, True)
+    logger.info(f"Invalidated cached auth data for user {user_id} (deleted={deleted})")
+
+
+async def get_current_principal(request: Request, token: Optional[str] = Depends(oauth2_scheme)) -> Principal:
+    token = token or request.cookies.get("access_token")
+    if not token:
+        raise _unauthorized("Not authenticated")
+    claims = await verify_token(token)
+    user_id = claims.get("sub")
+    if not user_id or user_id in _revoked_users:
+        raise _unauthorized()
+    # app_metadata is only writable with the service key. profiles.role is not
+    # trusted beyond proving the profile exists: users can update their own row.
+    role = (claims.get("app_metadata") or {}).get("role")
+    if not role and await get_profile_role(user_id):
+        role = SELF_SERVICE_ROLE
+    if not role:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No profile for this user")
+    return Principal(id=user_id, email=claims.get("email"), role=role)
+
+
+def require_role(*roles: str) -> Callable[..., Any]:
+    """
+    Dependency factory: require_role("admin") or require_role("admin", "farmer").
+    Use as `Depends(require_role("admin"))` on a route or in a router's dependencies.
+    """
+    async def dependency(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if roles and principal.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        return principal
+
+    return dependency
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger('storage')
+
+
+@dataclass
+class StoredObject:
+    key: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+class StorageWriter(ABC):
+    """
+    Incremental writer for a single object. Chunks are hashed and written off the
+    event loop, so memory use stays at one chunk regardless of object size.
+    The final key is content-addressed and only known once all data has been written.
+    """
+
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    async def write(self, chunk: bytes) -> None:
+        await asyncio.to_thread(self._write_sync, chunk)
+        self.size += len(chunk)
+
+    def _write_sync(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._write_chunk(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def content_key(self, prefix: str, suffix: str) -> str:
+        digest = self.sha256
+        return f"{prefix}/{digest[:2]}/{digest}{suffix}"
+
+    @abstractmethod
+    def _write_chunk(self, chunk: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def commit(self, prefix: str, suffix: str = "") -> StoredObject:
+        """Finish the upload and store it under its content-addressed key."""
+
+    @abstractmethod
+    async def abort(self) -> None:
+        """Discard everything written so far."""
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def open_writer(self) -> StorageWriter:
+        ...
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Map a URL produced by url_for back to its key, or None if it is not ours."""
+
+    @abstractmethod
+    async def materialize(self, key: str, scratch_dir: Path) -> Path:
+        """Return a local file path holding the object, downloading into scratch_dir if needed."""
+
+    @abstractmethod
+    async def put_file(self, key: str, source: Path, content_type: str) -> None:
+        """Store a local file under `key`, replacing any existing object. `source` is consumed."""
+
+
+class _SpoolingWriter(StorageWriter):
+    """Writer that spools chunks into a temporary file under `directory`."""
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__()
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self._tmp_path = Path(tmp_name)
+
+    def _write_chunk(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def _discard_sync(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    async def abort(self) -> None:
+        await asyncio.to_thread(self._discard_sync)
+
+
+class LocalStorageWriter(_SpoolingWriter):
+    def __init__(self, root: Path) -> None:
+        super().__init__(root / ".incoming")
+        self._root = root
+
+    def _commit_sync(self, key: str) -> bool:
+        self._file.close()
+        destination = self._root / key
+        if destination.exists():
+            self._tmp_path.unlink(missing_ok=True)
+            return True
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._tmp_path, destination)
+        return False
+
+    async def commit(self, prefix: str, suffix: str = "") -> StoredObject:
+        key = self.content_key(prefix, suffix)
+        deduplicated = await asyncio.to_thread(self._commit_sync, key)
+        return StoredObject(key=key, sha256=self.sha256, size=self.size, deduplicated=deduplicated)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Stores objects on the local filesystem. Intended for development and tests."""
+
+    def __init__(self, root: str, public_url: Optional[str] = None) -> None:
+        self.root = Path(root)
+        self.public_url = public_url.rstrip("/") if public_url else None
+
+    def open_writer(self) -> StorageWriter:
+        return LocalStorageWriter(self.root)
+
+    def url_for(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        return str(self.root / key)
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        if self.public_url and url.startswith(f"{self.public_url}/"):
+            return url[len(self.public_url) + 1:]
+        root = f"{self.root}{os.sep}"
+        if url.startswith(root):
+            return url[len(root):]
+        return None
+
+    async def materialize(self, key: str, scratch_dir: Path) -> Path:
+        return self.root / key
+
+    async def put_file(self, key: str, source: Path, content_type: str) -> None:
+        destination = self.root / key
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.move, source, destination)
+
+
+class SupabaseStorageWriter(_SpoolingWriter):
+    def __init__(self, bucket: str) -> None:
+        super().__init__(Path(tempfile.gettempdir()) / "banana-vision-uploads")
+        self._bucket = bucket
+
+    def _commit_sync(self, key: str) -> bool:
+        from app.core.supabase import supabase_admin
+
+        self._file.close()
+        try:
+            # httpx streams file-backed multipart bodies, so the spooled file is never read whole
+            supabase_admin.storage.from_(self._bucket).upload(
+                key, str(self._tmp_path), {"upsert": "false"}
+            )
+            return False
+        except Exception as exc:
+            if "duplicate" in str(exc).lower() or "already exists" in str(exc).lower():
+                return True
+            raise
+        finally:
+            self._tmp_path.unlink(missing_ok=True)
+
+    async def commit(self, prefix: str, suffix: str = "") -> StoredObject:
+        key = self.content_key(prefix, suffix)
+        deduplicated = await asyncio.to_thread(self._commit_sync, key)
+        return StoredObject(key=key, sha256=self.sha256, size=self.size, deduplicated=deduplicated)
+
+
+class SupabaseStorageBackend(StorageBackend):
+    def __init__(self, bucket: str) -> None:
+        self.bucket = bucket
+
+    def open_writer(self) -> StorageWriter:
+        return SupabaseStorageWriter(self.bucket)
+
+    def url_for(self, key: str) -> str:
+        from app.core.supabase import supabase_admin
+
+        return supabase_admin.storage.from_(self.bucket).get_public_url(key)
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        prefix = f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1/object/public/{self.bucket}/"
+        if url.startswith(prefix):
+            return url[len(prefix):].split("?", 1)[0]
+        return None
+
+    def _download_sync(self, key: str, destination: Path) -> None:
+        from app.core.supabase import supabase_admin
+
+        destination.write_bytes(supabase_admin.storage.from_(self.bucket).download(key))
+
+    async def materialize(self, key: str, scratch_dir: Path) -> Path:
+        destination = scratch_dir / Path(key).name
+        await asyncio.to_thread(self._download_sync, key, destination)
+        return destination
+
+    def _upload_sync(self, key: str, source: Path, content_type: str) -> None:
+        from app.core.supabase import supabase_admin
+
+        try:
+            supabase_admin.storage.from_(self.bucket).upload(
+                key, str(source), {"content-type": content_type, "upsert": "true"}
+            )
+        finally:
+            source.unlink(missing_ok=True)
+
+    async def put_file(self, key: str, source: Path, content_type: str) -> None:
+        await asyncio.to_thread(self._upload_sync, key, source, content_type)
+
+
+def _create_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "supabase":
+        return SupabaseStorageBackend(settings.SUPABASE_STORAGE_BUCKET)
+    if settings.STORAGE_BACKEND != "local":
+        logger.warning(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}', falling back to local")
+    return LocalStorageBackend(settings.STORAGE_LOCAL_ROOT, settings.STORAGE_PUBLIC_URL)
+
+
+storage: StorageBackend = _create_backend()
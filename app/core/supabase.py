@@ -1,12 +1,21 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from app.core.config import settings
 
+# Bound every HTTP call so threads abandoned at their resilience deadline eventually finish
 supabase: Client = create_client(
     supabase_url=settings.SUPABASE_URL,
-    supabase_key=settings.SUPABASE_KEY
+    supabase_key=settings.SUPABASE_KEY,
+    options=ClientOptions(
+        postgrest_client_timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS,
+        storage_client_timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS
+    )
 )
 
 supabase_admin: Client = create_client(
     supabase_url=settings.SUPABASE_URL,
-    supabase_key=settings.SUPABASE_SERVICE_KEY
+    supabase_key=settings.SUPABASE_SERVICE_KEY,
+    options=ClientOptions(
+        postgrest_client_timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS,
+        storage_client_timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS
+    )
 ) 
\ No newline at end of file
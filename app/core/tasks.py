@@ -0,0 +1,278 @@
+import asyncio
+import random
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.cache import CacheBackend, get_cache
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger('tasks')
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    max_attempts: int = 1
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: JobStatus = JobStatus.QUEUED
+    progress: float = 0.0
+    message: Optional[str] = None
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=_now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Set by the queue to publish progress reports to the shared status store
+    on_change: Optional[Callable[["Job"], None]] = field(default=None, repr=False, compare=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def set_progress(self, progress: float, message: Optional[str] = None) -> None:
+        """Called by job functions to report progress (0.0 - 1.0)."""
+        self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status.value,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+        }
+
+
+class JobQueue:
+    """
+    Lightweight in-process async job queue.
+
+    A fixed number of worker tasks pull jobs from a bounded asyncio.Queue. A job
+    function receives the Job as its first argument (for progress reporting);
+    raising marks the attempt as failed and it is retried with jittered
+    exponential backoff until max_attempts is reached. Finished jobs are kept
+    for status lookups up to `max_retained`.
+
+    Jobs run in the worker process that accepted them, but every status change
+    is also written to `store`. With a shared cache backend (CACHE_BACKEND=sqlite)
+    any worker process on the host can then answer status lookups.
+    """
+
+    RECENT_KEY = "recent"
+
+    def __init__(
+        self,
+        workers: int,
+        max_queued: int,
+        max_retained: int = 1000,
+        retry_backoff: float = 1.0,
+        store: Optional[CacheBackend] = None,
+    ) -> None:
+        self._workers_count = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._max_retained = max_retained
+        self._retry_backoff = retry_backoff
+        self._store = store
+        self._workers: List[asyncio.Task] = []
+        self._accepting = False
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._accepting = True
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self._workers_count)
+        ]
+        logger.info(f"Job queue started with {self._workers_count} workers")
+
+    def submit(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        max_attempts: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Job:
+        if not self._accepting:
+            raise QueueFullError("Job queue is not accepting jobs")
+        job = Job(
+            name=name,
+            func=func,
+            args=args,
+            kwargs=kwargs,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            on_change=self._publish,
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+        self._jobs[job.id] = job
+        self._evict()
+        self._publish(job)
+        self._index(job)
+        logger.info(f"Job {job.id} ({name}) queued")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job accepted by this or, via the shared store, any other worker."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self._store_get(job_id)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs across workers sharing the store, newest first."""
+        statuses = {job_id: job.to_dict() for job_id, job in self._jobs.items()}
+        for job_id in self._store_get(self.RECENT_KEY) or []:
+            if job_id not in statuses:
+                status = self._store_get(job_id)
+                if status is not None:
+                    statuses[job_id] = status
+        return sorted(statuses.values(), key=lambda status: status["created_at"], reverse=True)[:limit]
+
+    def _store_get(self, key: str) -> Any:
+        if self._store is None:
+            return None
+        try:
+            return self._store.get(key)
+        except Exception as exc:
+            logger.warning(f"Could not read job status store: {exc}")
+            return None
+
+    def _publish(self, job: Job) -> None:
+        # Status reporting must never fail the job itself
+        if self._store is None:
+            return
+        try:
+            self._store.set(job.id, job.to_dict())
+        except Exception as exc:
+            logger.warning(f"Could not publish status of job {job.id}: {exc}")
+
+    def _index(self, job: Job) -> None:
+        # Best effort: two workers submitting at once may drop an id from the
+        # listing, but never a job's own status entry.
+        if self._store is None:
+            return
+        try:
+            ids = [job_id for job_id in self._store.get(self.RECENT_KEY) or [] if job_id != job.id]
+            self._store.set(self.RECENT_KEY, [job.id] + ids[:self._max_retained - 1])
+        except Exception as exc:
+            logger.warning(f"Could not index job {job.id}: {exc}")
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        overflow = len(self._jobs) - self._max_retained
+        for job_id in finished[:max(overflow, 0)]:
+            del self._jobs[job_id]
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job: Job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.started_at = job.started_at or _now()
+        while True:
+            job.attempts += 1
+            job.status = JobStatus.RUNNING
+            self._publish(job)
+            try:
+                job.result = await job.func(job, *job.args, **job.kwargs)
+                job.status = JobStatus.SUCCEEDED
+                job.progress = 1.0
+                job.error = None
+                logger.info(f"Job {job.id} ({job.name}) succeeded after {job.attempts} attempt(s)")
+                break
+            except asyncio.CancelledError:
+                job.status = JobStatus.FAILED
+                job.error = "Cancelled during shutdown"
+                raise
+            except Exception as exc:
+                job.error = str(exc)
+                if job.attempts >= job.max_attempts:
+                    job.status = JobStatus.FAILED
+                    logger.error(f"Job {job.id} ({job.name}) failed after {job.attempts} attempt(s): {exc}")
+                    break
+                delay = self._retry_backoff * 2 ** (job.attempts - 1)
+                delay = random.uniform(delay / 2, delay)
+                job.status = JobStatus.RETRYING
+                self._publish(job)
+                logger.warning(f"Job {job.id} ({job.name}) attempt {job.attempts} failed: {exc}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            finally:
+                job.finished_at = _now() if job.done else None
+                self._publish(job)
+
+    async def shutdown(self, timeout: float) -> None:
+        """Stop accepting jobs, let queued/running ones finish for up to `timeout` seconds, then cancel."""
+        self._accepting = False
+        logger.info(f"Draining job queue ({self._queue.qsize()} queued)")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Job queue drain timed out after {timeout}s; cancelling remaining jobs")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            job.status = JobStatus.FAILED
+            job.error = "Not started before shutdown"
+            job.finished_at = _now()
+            self._publish(job)
+            self._queue.task_done()
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_queued=settings.JOB_QUEUE_SIZE,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+    store=get_cache("jobs", ttl=settings.JOB_STATUS_RETENTION_SECONDS),
+)
@@ -1,7 +1,16 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, inference_result, dashboard, user_routes
+from fastapi.responses import JSONResponse
+from app.routers import auth, inference_result, dashboard, user_routes, soil_readings, scans, jobs, health
 from app.core.config import settings
+from app.core.admission import AdmissionControlMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.resilience import breaker, UpstreamError
+from app.core.tasks import job_queue
+from app.services.preview_service import shutdown_executor
+from app.services.result_feed import result_feed
+from app.services.replica_service import replica
 
 
 # Force a valid prefix if the environment value is incorrect
@@ -10,12 +19,28 @@ if not api_prefix.startswith('/'):
     api_prefix = f"/{api_prefix}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    await replica.start()
+    yield
+    await replica.stop()
+    await result_feed.close()
+    await job_queue.shutdown(timeout=settings.JOB_DRAIN_TIMEOUT_SECONDS)
+    shutdown_executor()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Backend service for banana disease detection system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Shed excess load per route group. Registered before CORS so that CORS wraps it
+# and 429/503 responses still reach browsers with the right headers.
+app.add_middleware(AdmissionControlMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +48,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "Server-Timing"],
 )
 
+# Outermost, so every response (including CORS and shed responses) is eligible
+app.add_middleware(CompressionMiddleware)
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    # Supabase timed out or the circuit breaker is open: fail fast instead of hanging
+    retry_after = max(1, round(breaker.retry_after()))
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(retry_after)}
+    )
+
 # Include routers - making sure there's no tag or prefix issues
 app.include_router(
     auth.router, 
@@ -46,6 +85,23 @@ app.include_router(
     prefix=api_prefix,
     tags=["users"]
 )
+app.include_router(
+    soil_readings.router,
+    prefix=api_prefix,
+    tags=["soil_readings"]
+)
+app.include_router(
+    scans.router,
+    prefix=api_prefix,
+    tags=["scans"]
+)
+app.include_router(
+    jobs.router,
+    prefix=api_prefix,
+    tags=["jobs"]
+)
+
+app.include_router(health.router)
 
 @app.get("/")
 async def root():
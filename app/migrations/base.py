@@ -69,6 +69,27 @@ async def create_tables() -> None:
     for table_sql in tables:
         await supabase_admin.rpc('execute_sql', {'sql': table_sql})
 
+async def add_columns() -> None:
+    """Add columns introduced after the initial schema."""
+    columns = [
+        """
+        alter table if exists public.inference_results
+            add column if not exists regular_thumbnail_url text,
+            add column if not exists thermal_thumbnail_url text,
+            add column if not exists thermal_preview_url text
+        """,
+        # created_at is always stamped by the database (replica sync keys on it);
+        # device time of the capture goes in captured_at
+        """
+        alter table if exists public.inference_results
+            add column if not exists captured_at timestamp with time zone,
+            alter column created_at set default timezone('utc'::text, now())
+        """
+    ]
+
+    for column_sql in columns:
+        await supabase_admin.rpc('execute_sql', {'sql': column_sql})
+
 async def setup_rls() -> None:
     """Set up Row Level Security policies."""
     policies = [
@@ -95,14 +116,72 @@ async def create_indexes() -> None:
     indexes = [
         "create index if not exists idx_scans_farmer_id on public.scans(farmer_id);",
         "create index if not exists idx_scans_device_id on public.scans(device_id);",
-        "create index if not exists idx_soil_readings_scan_id on public.soil_readings(scan_id);"
+        "create index if not exists idx_soil_readings_scan_id on public.soil_readings(scan_id);",
+        "create index if not exists idx_soil_readings_reading_timestamp on public.soil_readings(reading_timestamp);",
+        # (reading_timestamp, id) keyset scans used by the soil time series
+        "create index if not exists idx_soil_readings_reading_timestamp_id on public.soil_readings(reading_timestamp, id);",
+        # (created_at, id) keyset scans used by the local replica sync
+        "create index if not exists idx_inference_results_created_at_id on public.inference_results(created_at, id);",
+        "create index if not exists idx_scans_created_at_id on public.scans(created_at, id);"
     ]
     
     for index_sql in indexes:
         await supabase_admin.rpc('execute_sql', {'sql': index_sql})
 
+async def create_functions() -> None:
+    """Create SQL functions called over RPC."""
+    functions = [
+        # Per-bucket min/max/avg/count of each soil metric over [start_ts, end_ts].
+        # Returns one jsonb array so PostgREST's row cap doesn't truncate it.
+        """
+        create or replace function public.soil_readings_buckets(
+            start_ts timestamptz, end_ts timestamptz, buckets int, metrics text[]
+        ) returns jsonb
+        language sql stable as $$
+            select coalesce(jsonb_agg(jsonb_build_array(bucket, metric, min_value, max_value, avg_value, value_count)
+                                      order by bucket, metric), '[]'::jsonb)
+            from (
+                select least(width_bucket(extract(epoch from r.reading_timestamp),
+                                          extract(epoch from start_ts), extract(epoch from end_ts), buckets),
+                             buckets) - 1 as bucket,
+                       m.metric,
+                       min(m.value) as min_value,
+                       max(m.value) as max_value,
+                       avg(m.value) as avg_value,
+                       count(*) as value_count
+                from public.soil_readings r
+                cross join lateral (values
+                    ('temperature', r.temperature), ('moisture', r.moisture), ('ph', r.ph),
+                    ('nitrogen', r.nitrogen), ('phosphorus', r.phosphorus), ('potassium', r.potassium)
+                ) as m(metric, value)
+                where r.reading_timestamp between start_ts and end_ts
+                  and m.value is not null
+                  and m.metric = any(metrics)
+                group by 1, 2
+            ) b
+        $$;
+        """,
+        # Batch write of re-fused values; touches only the fused columns
+        """
+        create or replace function public.apply_fusion_updates(changes jsonb)
+        returns void
+        language sql as $$
+            update public.inference_results t
+            set fused_confidence = c.fused_confidence,
+                fusion_decision = c.fusion_decision
+            from jsonb_to_recordset(changes) as c(id uuid, fused_confidence float, fusion_decision text)
+            where t.id = c.id
+        $$;
+        """
+    ]
+
+    for function_sql in functions:
+        await supabase_admin.rpc('execute_sql', {'sql': function_sql})
+
 async def run_migrations() -> None:
     """Run all migrations in order."""
     await create_tables()
+    await add_columns()
     await setup_rls()
-    await create_indexes() 
\ No newline at end of file
+    await create_indexes()
+    await create_functions()
\ No newline at end of file
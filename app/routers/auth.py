@@ -21,7 +21,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login")
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     # Delegate to service for token validation and user extraction
-    return get_current_user_from_token(token)
+    return await get_current_user_from_token(token)
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserRegister) -> User:
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException
 from typing import Any, Dict, Literal
 from app.services.inference_result_service import get_tree_stats
+from app.core.security import require_role
 
-router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], dependencies=[Depends(require_role("admin", "farmer"))])
 
 @router.get("/tree-stats", response_model=Dict[str, Any])
 async def tree_stats(
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.supabase import supabase_admin
+from app.core.resilience import breaker, probe_upstream, CircuitBreaker
+from app.core.admission import admission
+from app.services.replica_service import replica
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+PROBE_TIMEOUT_SECONDS = 2.0
+
+@router.get("/live")
+async def live():
+    """
+    Liveness: the process is up and its event loop is responsive.
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def ready():
+    """
+    Readiness: circuit breaker state plus the latency of a cheap upstream probe,
+    with admission-control load per route group and local replica sync state for
+    information. Returns 503 while the breaker is open or the probe fails.
+    """
+    probe = await probe_upstream(
+        lambda: supabase_admin.table("profiles").select("id").limit(1).execute(),
+        timeout=PROBE_TIMEOUT_SECONDS
+    )
+    circuit = breaker.snapshot()
+    is_ready = probe["ok"] and circuit["state"] != CircuitBreaker.OPEN
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "unavailable", "circuit_breaker": circuit, "upstream_probe": probe,
+                 "admission": admission.snapshot(), "replica": await replica.status()}
+    )
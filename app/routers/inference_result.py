@@ -1,7 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from app.schemas.inference_result import InferenceResultOut
-from app.services.inference_result_service import get_inference_results, delete_inference_result
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from app.schemas.inference_result import InferenceResultOut, InferenceResultCreate
+from app.services.inference_result_service import get_inference_results, get_inference_result, delete_inference_result, create_inference_result
+from app.services.preview_service import result_previews_job
+from app.services.fusion_service import refuse_job
+from app.services.result_feed import result_feed, FeedFullError
+from app.core.tasks import job_queue, QueueFullError
+from app.core.config import settings
+from app.core.security import require_role
 
 router = APIRouter(prefix="/inference-results", tags=["inference_results"])
 
@@ -22,9 +30,57 @@ async def list_inference_results(
         raise HTTPException(status_code=500, detail=result["error"])
     return result
 
+@router.post("/", status_code=201, response_model=Dict[str, Any], dependencies=[Depends(require_role("admin", "farmer"))])
+async def create_inference_result_endpoint(payload: InferenceResultCreate) -> Dict[str, Any]:
+    """
+    Store a new inference result. With the local replica enabled it is saved on the
+    device and uploaded in the background (`queued: true`), so this works offline.
+    """
+    result = await create_inference_result(payload)
+    if result["has_error"]:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+@router.get("/stream")
+async def stream_inference_results(
+    request: Request,
+    fusion_decision: Optional[Literal["healthy", "infected"]] = Query(None, description="Only push results with this decision"),
+    min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0, description="Only push results at or above this fused confidence")
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of newly inserted inference results (event: result).
+    Replaces polling the list endpoint. If the client falls behind, the oldest
+    undelivered results are dropped and a `lagged` event reports how many.
+    """
+    try:
+        subscription = result_feed.subscribe(fusion_decision=fusion_decision, min_confidence=min_confidence)
+    except FeedFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "10"})
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                rows = await subscription.next_batch(timeout=settings.FEED_HEARTBEAT_SECONDS)
+                dropped = subscription.take_dropped()
+                if dropped:
+                    yield f"event: lagged\ndata: {json.dumps({'dropped': dropped})}\n\n"
+                if not rows:
+                    yield ": keep-alive\n\n"
+                for row in rows:
+                    yield f"event: result\nid: {row['id']}\ndata: {InferenceResultOut(**row).model_dump_json()}\n\n"
+        finally:
+            result_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 from uuid import UUID
 
-@router.delete("/{id}", response_model=Dict[str, Any])
+@router.delete("/{id}", response_model=Dict[str, Any], dependencies=[Depends(require_role("admin"))])
 async def delete_inference_result_endpoint(id: UUID) -> Dict[str, Any]:
     """
     Delete an inference result by its UUID.
@@ -33,3 +89,32 @@ async def delete_inference_result_endpoint(id: UUID) -> Dict[str, Any]:
     if result["has_error"]:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
+
+@router.post("/{id}/previews", status_code=202, response_model=Dict[str, Any], dependencies=[Depends(require_role("admin"))])
+async def generate_inference_result_previews(id: UUID) -> Dict[str, Any]:
+    """
+    Queue (re)generation of the thumbnails and thermal preview for an inference result.
+    Poll /jobs/{job_id} for progress.
+    """
+    result = await get_inference_result(id)
+    if result["has_error"]:
+        raise HTTPException(status_code=404, detail=result["error"])
+    try:
+        job = job_queue.submit("result_previews", result_previews_job, result["data"])
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+    return {"id": str(id), "job_id": job.id, "status": job.status.value}
+
+@router.post("/refuse", status_code=202, response_model=Dict[str, Any], dependencies=[Depends(require_role("admin"))])
+async def refuse_inference_results(
+    dry_run: bool = Query(False, description="Only report how many decisions would flip"),
+    batch_size: int = Query(500, ge=1, le=1000)
+) -> Dict[str, Any]:
+    """
+    Queue a re-fusion of all stored results with the current fusion settings. Poll /jobs/{job_id} for progress.
+    """
+    try:
+        job = job_queue.submit("refuse_results", refuse_job, batch_size=batch_size, dry_run=dry_run, max_attempts=1)
+    except QueueFullError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+    return {"job_id": job.id, "status": job.status.value}
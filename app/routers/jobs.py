@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, Dict
+from app.core.tasks import job_queue
+from app.core.security import require_role
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(require_role("admin"))])
+
+@router.get("/", response_model=Dict[str, Any])
+async def list_jobs(limit: int = Query(50, ge=1, le=500)) -> Dict[str, Any]:
+    """
+    List the most recent background jobs, newest first.
+    """
+    return {"jobs": job_queue.recent(limit)}
+
+@router.get("/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    Status and progress of a background job.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Request, status
+from typing import Any, Dict
+from app.core.security import Principal, require_role
+from app.services.scan_service import stream_scan_upload
+from app.services.preview_service import schedule_scan_previews
+
+router = APIRouter(prefix="/scans", tags=["scans"])
+
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["normal_image", "thermal_image"],
+                    "properties": {
+                        "normal_image": {"type": "string", "format": "binary"},
+                        "thermal_image": {"type": "string", "format": "binary"},
+                        "farmer_id": {"type": "string", "format": "uuid"},
+                        "device_id": {"type": "string", "format": "uuid"},
+                        "scan_timestamp": {"type": "string", "format": "date-time"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+@router.post("/upload", status_code=status.HTTP_201_CREATED, response_model=Dict[str, Any], openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_scan(request: Request, principal: Principal = Depends(require_role("admin", "farmer"))) -> Dict[str, Any]:
+    """
+    Upload a regular + thermal image pair for one scan.
+    The body is parsed straight from the request stream (no UploadFile spooling), so
+    memory per request stays bounded regardless of image size.
+    farmer_id is only honoured for admins; farmers always upload as themselves.
+    Thumbnails and the thermal preview are generated by a queued job afterwards;
+    poll /jobs/{preview_job_id} for its status.
+    """
+    result = await stream_scan_upload(request, principal)
+    result["preview_job_id"] = schedule_scan_previews(
+        str(result["scan"].get("id")),
+        result["images"]["normal_image"]["path"],
+        result["images"]["thermal_image"]["path"],
+    )
+    return result
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+from app.services.soil_reading_service import get_soil_timeseries, SOIL_METRICS
+from app.core.security import require_role
+
+router = APIRouter(prefix="/soil-readings", tags=["soil_readings"], dependencies=[Depends(require_role("admin", "farmer"))])
+
+@router.get("/timeseries", response_model=Dict[str, Any])
+async def soil_timeseries(
+    start: Optional[datetime] = Query(None, description="Range start (ISO 8601). Defaults to 30 days before end."),
+    end: Optional[datetime] = Query(None, description="Range end (ISO 8601). Defaults to now."),
+    points: int = Query(500, ge=3, le=5000, description="Target number of points per series"),
+    method: Literal["bucket", "lttb"] = Query("bucket", description="bucket: min/max/avg per bucket, lttb: Largest-Triangle-Three-Buckets"),
+    metrics: Optional[List[str]] = Query(None, description=f"Metrics to include: {', '.join(SOIL_METRICS)}")
+) -> Dict[str, Any]:
+    """
+    Returns downsampled soil reading series for charting. Pass ?start=...&end=...&points=500&method=lttb.
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    unknown = [m for m in metrics or [] if m not in SOIL_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(unknown)}")
+
+    result = await get_soil_timeseries(start=start, end=end, points=points, method=method, metrics=metrics)
+    if result["has_error"]:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Query, Depends, HTTPException
 from typing import Optional
-from app.services.user_service import fetch_users_from_supabase, delete_user_from_supabase
-from app.schemas.user import User
+from app.services.user_service import fetch_users_from_supabase, delete_user_job, set_user_role
+from app.schemas.user import User, UserRoleUpdate
+from app.core.tasks import job_queue, QueueFullError
+from app.core.security import require_role
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], dependencies=[Depends(require_role("admin"))])
 
 @router.get("/", response_model=dict)
 async def get_users(
@@ -16,9 +18,25 @@ async def get_users(
         raise HTTPException(status_code=400, detail=result["error"])
     return {"users": result["users"], "total": result["total"]}
 
-@router.delete("/{user_id}", status_code=204)
-async def delete_user(user_id: str):
-    result = await delete_user_from_supabase(user_id)
+@router.put("/{user_id}/role")
+async def update_user_role(user_id: str, payload: UserRoleUpdate):
+    """
+    Grant a user the admin or farmer role. The user's current access token keeps its old role until it is refreshed.
+    """
+    result = await set_user_role(user_id, payload.role)
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["error"])
-    return None
+    return {"user_id": user_id, "role": payload.role}
+
+@router.delete("/{user_id}", status_code=202)
+async def delete_user(user_id: str):
+    """
+    Queue deletion of the user's profile and auth account. Poll /jobs/{job_id} for the outcome.
+    """
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+    try:
+        job = job_queue.submit("delete_user", delete_user_job, user_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {"job_id": job.id, "status": job.status.value}
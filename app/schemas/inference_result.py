@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Any, Optional
 from uuid import UUID
 from datetime import datetime
@@ -6,12 +6,29 @@ from datetime import datetime
 class InferenceResultOut(BaseModel):
     id: UUID
     created_at: datetime
+    captured_at: Optional[datetime] = None
     regular_result: Optional[Any]
     thermal_result: Optional[Any]
     fused_confidence: Optional[float]
     fusion_decision: Optional[str]
     regular_output_url: Optional[str]
     thermal_output_url: Optional[str]
+    regular_thumbnail_url: Optional[str] = None
+    thermal_thumbnail_url: Optional[str] = None
+    thermal_preview_url: Optional[str] = None
 
     class Config:
         orm_mode = True
+
+class InferenceResultCreate(BaseModel):
+    # A client-generated id makes retried uploads from edge devices idempotent
+    id: Optional[UUID] = None
+    # Device time of the capture. created_at is always stamped by the database on
+    # insert; a client-sent created_at is accepted here for older clients.
+    captured_at: Optional[datetime] = Field(None, validation_alias=AliasChoices("captured_at", "created_at"))
+    regular_result: Optional[Any] = None
+    thermal_result: Optional[Any] = None
+    fused_confidence: Optional[float] = None
+    fusion_decision: Optional[str] = None
+    regular_output_url: Optional[str] = None
+    thermal_output_url: Optional[str] = None
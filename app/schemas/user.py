@@ -13,6 +13,9 @@ class UserRegister(BaseModel):
     password: str = Field(..., min_length=8)
     first_name: str
     last_name: str
+    # No role: self-registered users are always farmers, admins are made with PUT /users/{id}/role
+
+class UserRoleUpdate(BaseModel):
     role: str = Field(..., pattern="^(admin|farmer)$")
 
 class UserUpdate(BaseModel):
@@ -5,19 +5,22 @@ from app.schemas.user import User, UserRegister, TokenWithRefresh
 from app.core.supabase import supabase, supabase_admin
 from typing import Optional, Dict, Any
 from app.core.logging import get_logger
+from app.core.resilience import call_supabase, UpstreamError
+from app.core.security import SELF_SERVICE_ROLE
+from app.services.user_service import invalidate_user_search
 from fastapi import Response,Request
 from fastapi.responses import JSONResponse
 
 logger = get_logger('auth_service')
 
-def get_current_user_from_token(token: str) -> User:
+async def get_current_user_from_token(token: str) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        user = supabase.auth.get_user(token)
+        user = await call_supabase("auth.get_user", lambda: supabase.auth.get_user(token), idempotent=True)
         if not user:
             raise credentials_exception
         return User(
@@ -29,6 +32,8 @@ def get_current_user_from_token(token: str) -> User:
             created_at=user.user.created_at,
             updated_at=user.user.updated_at
         )
+    except UpstreamError:
+        raise
     except Exception:
         raise credentials_exception
 
@@ -39,7 +44,7 @@ async def delete_auth_user(user_id: str) -> None:
     """
     try:
         # Use admin client to delete the user
-        supabase_admin.auth.admin.delete_user(user_id)
+        await call_supabase("auth.admin.delete_user", lambda: supabase_admin.auth.admin.delete_user(user_id))
         logger.info(f"Successfully deleted auth user: {user_id}")
     except Exception as e:
         logger.error(f"Failed to delete auth user {user_id}: {str(e)}")
@@ -58,13 +63,17 @@ async def create_profile(user_id: str, user_data: Dict[str, Any]) -> None:
             'role': user_data['role']
         }
         
-        response = supabase_admin.table('profiles').insert(data).execute()
+        response = await call_supabase(
+            "profiles.insert",
+            lambda: supabase_admin.table('profiles').insert(data).execute()
+        )
         
         if hasattr(response, 'error') and response.error is not None:
             logger.error(f"Error creating profile: {response.error}")
             await delete_auth_user(user_id)
             raise ValueError(f"Error creating profile: {response.error}")
             
+        invalidate_user_search()
         logger.info(f"Profile created for user: {user_data['email']}")
         
     except Exception as e:
@@ -78,17 +87,17 @@ async def create_profile(user_id: str, user_data: Dict[str, Any]) -> None:
 
 async def register_user(user_data: UserRegister) -> User:
     try:
-        auth_response = supabase.auth.sign_up({
+        auth_response = await call_supabase("auth.sign_up", lambda: supabase.auth.sign_up({
             "email": user_data.email,
             "password": user_data.password,
             "options": {
                 "data": {
                     "first_name": user_data.first_name,
                     "last_name": user_data.last_name,
-                    "role": user_data.role
+                    "role": SELF_SERVICE_ROLE
                 }
             }
-        })
+        }))
         if not auth_response.user:
             logger.error(f"Failed to create user: {user_data.email}")
             raise HTTPException(
@@ -100,18 +109,20 @@ async def register_user(user_data: UserRegister) -> User:
                     "email": user_data.email,
                     "first_name": user_data.first_name,
                     "last_name": user_data.last_name,
-                    "role": user_data.role
+                    "role": SELF_SERVICE_ROLE
                 })
         return User(
             id=auth_response.user.id,
             email=auth_response.user.email,
             first_name=user_data.first_name,
             last_name=user_data.last_name,
-            role=user_data.role,
+            role=SELF_SERVICE_ROLE,
             is_active=True,
             created_at=auth_response.user.created_at,
             updated_at=auth_response.user.updated_at
         )
+    except UpstreamError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -120,10 +131,10 @@ async def register_user(user_data: UserRegister) -> User:
 
 async def login_user(form_data: OAuth2PasswordRequestForm) -> JSONResponse:
     try:
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await call_supabase("auth.sign_in_with_password", lambda: supabase.auth.sign_in_with_password({
             "email": form_data.username,
             "password": form_data.password
-        })
+        }))
         if not auth_response.session or not auth_response.session.access_token:
             raise ValueError("Authentication failed - no session")
         print("Auth response: ", auth_response)
@@ -157,6 +168,8 @@ async def login_user(form_data: OAuth2PasswordRequestForm) -> JSONResponse:
             max_age=604800
         )
         return response
+    except UpstreamError:
+        raise
     except Exception as e:
         error_msg = str(e).lower()
         if "email not confirmed" in error_msg:
@@ -184,7 +197,7 @@ async def logout_user(request: Request) -> JSONResponse:
         try:
             # Set the access token in the Supabase client for this operation
             supabase.auth.session = {"access_token": access_token}
-            supabase.auth.sign_out()
+            await call_supabase("auth.sign_out", supabase.auth.sign_out)
             logger.info("Supabase token revoked for logout")
         except Exception as e:
             logger.error(f"Failed to revoke Supabase token: {str(e)}")
@@ -202,7 +215,7 @@ async def refresh_user_token(request: Request) -> JSONResponse:
         refresh_token = request.cookies.get("refresh_token")
         if not refresh_token:
             raise HTTPException(status_code=401, detail="No refresh token")
-        auth_response = supabase.auth.refresh_session(refresh_token)
+        auth_response = await call_supabase("auth.refresh_session", lambda: supabase.auth.refresh_session(refresh_token))
         response = JSONResponse({
             "message": "Token refreshed",
             "access_token": auth_response.session.access_token,
@@ -233,6 +246,8 @@ async def refresh_user_token(request: Request) -> JSONResponse:
             max_age=604800
         )
         return response
+    except UpstreamError:
+        raise
     except Exception as e:
         error_msg = str(e).lower()
         if "invalid refresh token" in error_msg:
@@ -0,0 +1,199 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import Counter
+import numpy as np
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+from app.core.tasks import Job
+from app.core.resilience import call_supabase
+from app.core.logging import get_logger
+from app.services.inference_result_service import invalidate_tree_stats
+from app.services.replica_service import replica
+
+logger = get_logger('fusion_service')
+
+HEALTHY = "healthy"
+INFECTED = "infected"
+
+LABEL_KEYS = ("label", "class", "prediction", "decision")
+SCORE_KEYS = ("confidence", "score", "probability")
+
+
+def extract_infected_probability(result: Any) -> float:
+    """
+    Read a single-modality model output and return P(infected), or NaN if the
+    payload has no usable score. Accepts a bare number, a {label, confidence}
+    style dict, or a list of such dicts (the highest infected probability wins).
+    """
+    if result is None:
+        return np.nan
+    if isinstance(result, (int, float)) and not isinstance(result, bool):
+        return float(result)
+    if isinstance(result, list):
+        scores = [extract_infected_probability(item) for item in result]
+        scores = [s for s in scores if not np.isnan(s)]
+        return max(scores) if scores else np.nan
+    if not isinstance(result, dict):
+        return np.nan
+
+    score = next((result[k] for k in SCORE_KEYS if isinstance(result.get(k), (int, float))), None)
+    if score is None:
+        return np.nan
+    label = next((str(result[k]).lower() for k in LABEL_KEYS if result.get(k) is not None), None)
+    if label is not None and label.startswith(HEALTHY):
+        return 1.0 - float(score)
+    return float(score)
+
+
+def fuse(
+    regular: np.ndarray,
+    thermal: np.ndarray,
+    regular_weight: Optional[float] = None,
+    thermal_weight: Optional[float] = None,
+    threshold: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Weighted late fusion of per-modality P(infected) arrays.
+
+    A missing modality (NaN) drops out and the remaining weight is renormalised.
+    Returns (fused_confidence, is_infected, valid) where fused_confidence is the
+    confidence in the chosen decision and valid marks rows with at least one score.
+    """
+    w_r = settings.FUSION_REGULAR_WEIGHT if regular_weight is None else regular_weight
+    w_t = settings.FUSION_THERMAL_WEIGHT if thermal_weight is None else thermal_weight
+    threshold = settings.FUSION_THRESHOLD if threshold is None else threshold
+
+    has_r = ~np.isnan(regular)
+    has_t = ~np.isnan(thermal)
+    weights = has_r * w_r + has_t * w_t
+    valid = weights > 0
+    weighted = np.where(has_r, regular, 0.0) * w_r + np.where(has_t, thermal, 0.0) * w_t
+    p_infected = np.divide(weighted, weights, out=np.full_like(weighted, np.nan), where=valid)
+    p_infected = np.clip(p_infected, 0.0, 1.0)
+
+    is_infected = p_infected >= threshold
+    confidence = np.where(is_infected, p_infected, 1.0 - p_infected)
+    return confidence, is_infected, valid
+
+
+def _modality_scores(rows: List[Dict[str, Any]], column: str) -> Tuple[np.ndarray, np.ndarray]:
+    """P(infected) per row for one modality, plus a mask of rows whose output is present but unreadable."""
+    scores = np.array([extract_infected_probability(r.get(column)) for r in rows], dtype=np.float64)
+    present = np.array([r.get(column) is not None for r in rows], dtype=bool)
+    return scores, present & np.isnan(scores)
+
+
+def refuse_batch(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Counter, int]:
+    """
+    Recompute fusion for a batch of rows. Returns the rows whose stored confidence
+    or decision changed (with new values applied), a Counter of decision flips and
+    the number of rows skipped because a stored model output couldn't be parsed -
+    fusing those on the remaining modality alone would silently change the result.
+    """
+    regular, regular_unreadable = _modality_scores(rows, "regular_result")
+    thermal, thermal_unreadable = _modality_scores(rows, "thermal_result")
+    confidence, is_infected, valid = fuse(regular, thermal)
+    unreadable = regular_unreadable | thermal_unreadable
+    valid &= ~unreadable
+
+    old_confidence = np.array(
+        [np.nan if r.get("fused_confidence") is None else r["fused_confidence"] for r in rows],
+        dtype=np.float64,
+    )
+    old_decision = np.array([(r.get("fusion_decision") or "").lower() for r in rows])
+    new_decision = np.where(is_infected, INFECTED, HEALTHY)
+
+    decision_changed = valid & (old_decision != new_decision)
+    confidence_changed = valid & ~np.isclose(old_confidence, confidence, atol=1e-6)
+    changed = np.flatnonzero(decision_changed | confidence_changed)
+
+    flips = Counter(
+        f"{old_decision[i] or 'none'}->{new_decision[i]}" for i in np.flatnonzero(decision_changed)
+    )
+    updates = [
+        {**rows[i], "fused_confidence": round(float(confidence[i]), 6), "fusion_decision": str(new_decision[i])}
+        for i in changed
+    ]
+    return updates, flips, int(unreadable.sum())
+
+
+async def refuse_all_results(
+    batch_size: int = 500,
+    dry_run: bool = False,
+    on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Stream every inference result in id-keyset batches, recompute fused confidence and
+    decision with the current fusion settings and bulk-write back the rows that changed.
+    on_progress(scanned, total) is called after every batch.
+    """
+    scanned = updated = skipped = 0
+    total: Optional[int] = None
+    flips: Counter = Counter()
+    last_id: Optional[str] = None
+    while True:
+        query = (
+            supabase_admin
+            .table("inference_results")
+            .select(
+                "id,created_at,regular_result,thermal_result,fused_confidence,fusion_decision",
+                count="exact" if last_id is None else None
+            )
+            .order("id", desc=False)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        response = await call_supabase("inference_results.refuse_batch", query.execute, idempotent=True)
+        if hasattr(response, 'error') and response.error:
+            raise ValueError(str(response.error))
+        if last_id is None:
+            total = response.count
+        rows = response.data or []
+        if not rows:
+            break
+
+        changes, batch_flips, batch_skipped = refuse_batch(rows)
+        scanned += len(rows)
+        skipped += batch_skipped
+        flips.update(batch_flips)
+        if changes and not dry_run:
+            # Only the fused columns are sent: one UPDATE ... FROM for the whole batch
+            # (public.apply_fusion_updates, see migrations)
+            fused = [
+                {"id": c["id"], "fused_confidence": c["fused_confidence"], "fusion_decision": c["fusion_decision"]}
+                for c in changes
+            ]
+            write = await call_supabase(
+                "inference_results.refuse_update",
+                lambda: supabase_admin.rpc("apply_fusion_updates", {"changes": fused}).execute()
+            )
+            if hasattr(write, 'error') and write.error:
+                raise ValueError(str(write.error))
+            if replica.enabled:
+                await replica.update_results(fused)
+        updated += len(changes)
+        last_id = rows[-1]["id"]
+        logger.info(
+            f"Re-fusion batch: scanned={scanned}, changed={updated}, skipped={skipped}, flips={dict(flips)}"
+        )
+        if on_progress is not None:
+            on_progress(scanned, total)
+
+    if updated and not dry_run:
+        invalidate_tree_stats()
+    return {
+        "scanned": scanned,
+        "changed": updated,
+        "flipped": sum(flips.values()),
+        "flips": dict(flips),
+        "skipped": skipped,
+        "dry_run": dry_run,
+    }
+
+
+async def refuse_job(job: Job, batch_size: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """Job wrapper around refuse_all_results that reports progress on the job."""
+    def report(scanned: int, total: Optional[int]) -> None:
+        job.set_progress(scanned / total if total else 0.0, f"Scanned {scanned} of {total or '?'} results")
+
+    return await refuse_all_results(batch_size=batch_size, dry_run=dry_run, on_progress=report)
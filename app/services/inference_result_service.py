@@ -1,5 +1,6 @@
 from typing import List
 from app.core.supabase import supabase, supabase_admin
+from app.core.resilience import call_supabase, UpstreamError
 from app.core.logging import get_logger
 from app.schemas.inference_result import InferenceResultOut
 from uuid import UUID
@@ -9,20 +10,39 @@ logger = get_logger('inference_result_service')
 
 from typing import List, Tuple, Dict, Any
 from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.schemas.inference_result import InferenceResultCreate
+from app.services.replica_service import replica
+
+RESULT_COLUMNS = "id,created_at,captured_at,regular_result,thermal_result,fused_confidence,fusion_decision,regular_output_url,thermal_output_url,regular_thumbnail_url,thermal_thumbnail_url,thermal_preview_url"
+
+# Tree stats scan every result of a type; cache them briefly and drop them when results change
+_tree_stats_cache = get_cache("dashboard.tree_stats", ttl=settings.DASHBOARD_STATS_CACHE_SECONDS)
+
+
+def invalidate_tree_stats() -> None:
+    _tree_stats_cache.clear()
+
 
 async def get_inference_results(limit: int = 20, offset: int = 0) -> Dict[str, Any]:
     try:
+        if replica.enabled:
+            rows, total = await replica.list_results(limit, offset)
+            return {"data": [InferenceResultOut(**row) for row in rows], "total": total, "has_error": False, "error": None}
         # Use count='exact' for total count (for pagination)
-        response = (
-            supabase_admin
-            .table("inference_results")
-            .select(
-                "id,created_at,regular_result,thermal_result,fused_confidence,fusion_decision,regular_output_url,thermal_output_url",
-                count="exact"
-            )
-            .order("created_at", desc=True)
-            .range(offset, offset + limit - 1)
-            .execute()
+        response = await call_supabase(
+            "inference_results.list",
+            lambda: (
+                supabase_admin
+                .table("inference_results")
+                .select(RESULT_COLUMNS, count="exact")
+                .order("created_at", desc=True)
+                .range(offset, offset + limit - 1)
+                .execute()
+            ),
+            idempotent=True
         )
         logger.info(f"Supabase raw response: {response}")
         if hasattr(response, 'error') and response.error:
@@ -32,31 +52,75 @@ async def get_inference_results(limit: int = 20, offset: int = 0) -> Dict[str, A
         total = response.count if hasattr(response, 'count') else response.get("count", 0)
         logger.info(f"Supabase data: {data} | total: {total}")
         return {"data": [InferenceResultOut(**row) for row in data], "total": total, "has_error": False, "error": None}
+    except UpstreamError:
+        raise
     except Exception as exc:
         logger.error(f"Exception in get_inference_results: {exc}")
         return {"data": [], "total": 0, "has_error": True, "error": str(exc)}
 
 
+async def get_inference_result(id: UUID) -> Dict[str, Any]:
+    """
+    Fetch a single inference result row by its UUID (from the local replica when enabled).
+    """
+    try:
+        if replica.enabled:
+            row = await replica.get_result(str(id))
+            if row is not None:
+                return {"data": row, "has_error": False, "error": None}
+        response = await call_supabase(
+            "inference_results.get",
+            lambda: (
+                supabase_admin
+                .table("inference_results")
+                .select("id,regular_output_url,thermal_output_url")
+                .eq("id", str(id))
+                .limit(1)
+                .execute()
+            ),
+            idempotent=True
+        )
+        if hasattr(response, 'error') and response.error:
+            logger.error(f"Supabase error: {response.error}")
+            return {"data": None, "has_error": True, "error": str(response.error)}
+        if not response.data:
+            return {"data": None, "has_error": True, "error": "Inference result not found"}
+        return {"data": response.data[0], "has_error": False, "error": None}
+    except UpstreamError:
+        raise
+    except Exception as exc:
+        logger.error(f"Exception in get_inference_result: {exc}")
+        return {"data": None, "has_error": True, "error": str(exc)}
+
+
 async def delete_inference_result(id: UUID) -> dict:
     """
     Delete an inference result row by its UUID.
     Returns a dict with operation result and error info.
     """
     try:
-        response = (
-            supabase_admin
-            .table("inference_results")
-            .delete()
-            .eq("id", str(id))
-            .execute()
+        response = await call_supabase(
+            "inference_results.delete",
+            lambda: (
+                supabase_admin
+                .table("inference_results")
+                .delete()
+                .eq("id", str(id))
+                .execute()
+            )
         )
         logger.info(f"Delete response: {response}")
         if hasattr(response, 'error') and response.error:
             logger.error(f"Supabase error: {response.error}")
             return {"success": False, "has_error": True, "error": str(response.error)}
         if (hasattr(response, 'data') and response.data) or (isinstance(response, dict) and response.get("data")):
+            if replica.enabled:
+                await replica.remove_result(str(id))
+            invalidate_tree_stats()
             return {"success": True, "has_error": False, "error": None}
         return {"success": False, "has_error": True, "error": "No row deleted"}
+    except UpstreamError:
+        raise
     except Exception as exc:
         logger.error(f"Exception in delete_inference_result: {exc}")
         return {"success": False, "has_error": True, "error": str(exc)}
@@ -66,7 +130,11 @@ async def get_tree_stats(tree_type: str = "Healthy") -> Dict[str, Any]:
     """
     Returns total number of trees and weekly timeseries for the past 12 weeks, grouped by fusion_decision.
     tree_type: 'Healthy' or 'Infected' (case-insensitive, matches fusion_decision)
+    Results are cached for DASHBOARD_STATS_CACHE_SECONDS.
     """
+    cached = _tree_stats_cache.get(tree_type)
+    if cached is not None:
+        return cached
     try:
         now = datetime.now(timezone.utc)
         # Normalize tree_type
@@ -74,18 +142,25 @@ async def get_tree_stats(tree_type: str = "Healthy") -> Dict[str, Any]:
 
         # Fetch all created_at for this fusion_decision (limit to last ~6 weeks for efficiency)
         # We'll determine the latest ISO week with data, then backtrack 5 more weeks
-        data_resp = (
-            supabase_admin
-            .table("inference_results")
-            .select("created_at")
-            .eq("fusion_decision", fusion_decision)
-            .order("created_at", desc=False)
-            .execute()
-        )
-        if hasattr(data_resp, 'error') and data_resp.error:
-            logger.error(f"Supabase error (fetch): {data_resp.error}")
-            return {"series": [], "weeks": [], "totalTrees": 0, "has_error": True, "error": str(data_resp.error)}
-        rows = data_resp.data if hasattr(data_resp, 'data') else data_resp["data"]
+        if replica.enabled:
+            rows = [{"created_at": created_at} for created_at in await replica.result_created_ats(fusion_decision)]
+        else:
+            data_resp = await call_supabase(
+                "inference_results.tree_stats",
+                lambda: (
+                    supabase_admin
+                    .table("inference_results")
+                    .select("created_at")
+                    .eq("fusion_decision", fusion_decision)
+                    .order("created_at", desc=False)
+                    .execute()
+                ),
+                idempotent=True
+            )
+            if hasattr(data_resp, 'error') and data_resp.error:
+                logger.error(f"Supabase error (fetch): {data_resp.error}")
+                return {"series": [], "weeks": [], "totalTrees": 0, "has_error": True, "error": str(data_resp.error)}
+            rows = data_resp.data if hasattr(data_resp, 'data') else data_resp["data"]
         # Aggregate by ISO week (year, week)
         from collections import defaultdict
         week_counts_map = defaultdict(int)
@@ -120,13 +195,89 @@ async def get_tree_stats(tree_type: str = "Healthy") -> Dict[str, Any]:
         # Total count for this type
         total = sum(week_counts_map.values())
         logger.info(f"Tree stats (ISO, ends now) for {tree_type}: total={total}, weeks={week_labels}, series={week_counts}")
-        return {
+        stats = {
             "series": [{"name": tree_type, "data": week_counts}],
             "weeks": week_labels,
             "totalTrees": total,
             "has_error": False,
             "error": None
         }
+        _tree_stats_cache.set(tree_type, stats)
+        return stats
+    except UpstreamError:
+        raise
     except Exception as exc:
         logger.error(f"Exception in get_tree_stats: {exc}")
         return {"series": [], "weeks": [], "totalTrees": 0, "has_error": True, "error": str(exc)}
+
+
+async def create_inference_result(payload: InferenceResultCreate) -> Dict[str, Any]:
+    """
+    Store a new inference result. Fused confidence/decision are computed with the
+    current fusion settings when the payload doesn't carry them.
+
+    With the local replica enabled the row is written locally and queued for upload
+    (`queued` is True), so creation works while the device is offline.
+    """
+    from app.services.fusion_service import refuse_batch
+    from app.services.preview_service import schedule_result_previews
+
+    row = payload.model_dump(mode="json")
+    row["id"] = row.get("id") or str(uuid4())
+    if payload.captured_at is not None and payload.captured_at.tzinfo is None:
+        row["captured_at"] = payload.captured_at.replace(tzinfo=timezone.utc).isoformat()
+    if row.get("fused_confidence") is None or row.get("fusion_decision") is None:
+        fused, _, _ = refuse_batch([row])
+        if fused:
+            row = fused[0]
+    try:
+        if replica.enabled:
+            # Provisional, in PostgREST's UTC format so it sorts with pulled rows;
+            # replaced by the database's stamp once the row is pushed
+            row["created_at"] = datetime.now(timezone.utc).isoformat()
+            result = InferenceResultOut(**row)
+            await replica.enqueue_result(row)
+            invalidate_tree_stats()
+            schedule_result_previews(row)
+            return {"data": result, "queued": True, "has_error": False, "error": None}
+        # A client retrying with the same id gets the stored row back instead of a
+        # duplicate key error, which also makes the write safe for call_supabase to retry
+        response = await call_supabase(
+            "inference_results.insert",
+            lambda: (
+                supabase_admin
+                .table("inference_results")
+                .upsert(row, on_conflict="id", ignore_duplicates=True)
+                .execute()
+            ),
+            idempotent=True
+        )
+        if hasattr(response, 'error') and response.error:
+            logger.error(f"Supabase error: {response.error}")
+            return {"data": None, "queued": False, "has_error": True, "error": str(response.error)}
+        if response.data:
+            created = response.data[0]
+            invalidate_tree_stats()
+            schedule_result_previews(created)
+        else:
+            existing = await call_supabase(
+                "inference_results.get",
+                lambda: (
+                    supabase_admin
+                    .table("inference_results")
+                    .select(RESULT_COLUMNS)
+                    .eq("id", row["id"])
+                    .limit(1)
+                    .execute()
+                ),
+                idempotent=True
+            )
+            if not existing.data:
+                return {"data": None, "queued": False, "has_error": True, "error": "Inference result was not stored"}
+            created = existing.data[0]
+        return {"data": InferenceResultOut(**created), "queued": False, "has_error": False, "error": None}
+    except UpstreamError:
+        raise
+    except Exception as exc:
+        logger.error(f"Exception in create_inference_result: {exc}")
+        return {"data": None, "queued": False, "has_error": True, "error": str(exc)}
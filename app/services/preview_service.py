@@ -0,0 +1,221 @@
+import asyncio
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.core.imaging import render_thumbnail, render_thermal_preview
+from app.core.storage import storage
+from app.core.supabase import supabase_admin
+from app.core.resilience import call_supabase
+from app.core.tasks import Job, QueueFullError, job_queue
+from app.core.logging import get_logger
+from app.services.replica_service import replica
+
+logger = get_logger('tasks')
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Lazily start the process pool used for image decoding/encoding.
+    Spawned (not forked) so workers don't inherit the server's threads and sockets.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PREVIEW_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def derived_key(key: str, tag: str) -> str:
+    """scans/ab/abcd.png -> scans/ab/abcd_thumb.jpg"""
+    path = PurePosixPath(key)
+    return str(path.with_name(f"{path.stem}_{tag}.jpg"))
+
+
+def _download_sync(url: str, destination: Path) -> None:
+    with httpx.stream("GET", url, follow_redirects=True, timeout=30.0) as response:
+        response.raise_for_status()
+        with open(destination, "wb") as fh:
+            for chunk in response.iter_bytes():
+                fh.write(chunk)
+
+
+def _key_for(ref: str) -> Optional[str]:
+    """Storage key for a stored path or URL, or None for URLs outside our storage."""
+    key = storage.key_from_url(ref)
+    if key is None and "://" not in ref:
+        key = ref
+    return key
+
+
+async def _source_file(ref: str, scratch_dir: Path, name: str) -> Path:
+    """Resolve a storage key or URL to a local file the pool workers can read."""
+    key = _key_for(ref)
+    if key is not None:
+        return await storage.materialize(key, scratch_dir)
+    destination = scratch_dir / name
+    await asyncio.to_thread(_download_sync, ref, destination)
+    return destination
+
+
+async def _render(func, source: Path, key: str, size: int, scratch_dir: Path) -> str:
+    output = scratch_dir / PurePosixPath(key).name
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(get_executor(), func, str(source), str(output), size)
+    await storage.put_file(key, output, "image/jpeg")
+    return key
+
+
+async def generate_previews(
+    regular_ref: Optional[str],
+    thermal_ref: Optional[str],
+    fallback_prefix: str,
+) -> Dict[str, str]:
+    """
+    Generate thumbnails for both images and a false-colour preview of the thermal image.
+    Outputs are stored next to the originals when those live in our storage backend,
+    otherwise under `fallback_prefix`. Returns output keys by kind.
+    """
+    outputs: Dict[str, str] = {}
+    scratch_dir = Path(tempfile.mkdtemp(prefix="banana-vision-previews-"))
+    try:
+        jobs = []
+        for name, ref in (("regular", regular_ref), ("thermal", thermal_ref)):
+            if not ref:
+                continue
+            source = await _source_file(ref, scratch_dir, f"{name}_source")
+            base = _key_for(ref) or f"{fallback_prefix}/{name}"
+            jobs.append((f"{name}_thumbnail", render_thumbnail, source, derived_key(base, "thumb"), settings.THUMBNAIL_SIZE))
+            if name == "thermal":
+                jobs.append(("thermal_preview", render_thermal_preview, source, derived_key(base, "preview"), settings.THERMAL_PREVIEW_SIZE))
+        keys = await asyncio.gather(*(
+            _render(func, source, key, size, scratch_dir) for _, func, source, key, size in jobs
+        ))
+        outputs = {kind: key for (kind, *_), key in zip(jobs, keys)}
+    finally:
+        await asyncio.to_thread(shutil.rmtree, scratch_dir, True)
+    return outputs
+
+
+async def scan_previews_job(job: Job, scan_id: str, normal_image_path: str, thermal_image_path: str) -> Dict[str, str]:
+    """Job run after a scan upload; previews sit next to the stored images. Raising lets the queue retry."""
+    outputs = await generate_previews(normal_image_path, thermal_image_path, f"previews/scans/{scan_id}")
+    logger.info(f"Generated previews for scan {scan_id}: {outputs}")
+    return outputs
+
+
+def schedule_scan_previews(scan_id: str, normal_image_path: str, thermal_image_path: str) -> Optional[str]:
+    """
+    Queue preview generation for an uploaded scan and return the job id, or None
+    when the queue is full. Runs on the job queue rather than as a response
+    background task, so the upload's admission slot is released on response.
+    """
+    try:
+        return job_queue.submit("scan_previews", scan_previews_job, scan_id, normal_image_path, thermal_image_path).id
+    except QueueFullError as exc:
+        logger.warning(f"Previews for scan {scan_id} not queued: {exc}")
+        return None
+
+
+async def process_result_previews(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate previews for an inference_results row and store their URLs on it.
+    Returns a dict with operation result and error info.
+    """
+    result_id = result["id"]
+    try:
+        outputs = await generate_previews(
+            result.get("regular_output_url"),
+            result.get("thermal_output_url"),
+            f"previews/results/{result_id}",
+        )
+        update = {
+            "regular_thumbnail_url": storage.url_for(outputs["regular_thumbnail"]) if "regular_thumbnail" in outputs else None,
+            "thermal_thumbnail_url": storage.url_for(outputs["thermal_thumbnail"]) if "thermal_thumbnail" in outputs else None,
+            "thermal_preview_url": storage.url_for(outputs["thermal_preview"]) if "thermal_preview" in outputs else None,
+        }
+        response = await call_supabase(
+            "inference_results.update_previews",
+            lambda: (
+                supabase_admin
+                .table("inference_results")
+                .update(update)
+                .eq("id", str(result_id))
+                .execute()
+            )
+        )
+        if hasattr(response, 'error') and response.error:
+            logger.error(f"Supabase error storing previews for result {result_id}: {response.error}")
+            return {"success": False, "has_error": True, "error": str(response.error)}
+        if replica.enabled:
+            await replica.update_results([{"id": result_id, **update}])
+        logger.info(f"Generated previews for result {result_id}: {update}")
+        return {"success": True, "has_error": False, "error": None, "data": update}
+    except Exception as exc:
+        logger.error(f"Preview generation failed for result {result_id}: {exc}")
+        return {"success": False, "has_error": True, "error": str(exc)}
+
+
+async def result_previews_job(job: Job, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Job wrapper around process_result_previews; raising lets the queue retry."""
+    outcome = await process_result_previews(result)
+    if outcome["has_error"]:
+        raise RuntimeError(outcome["error"])
+    return outcome["data"]
+
+
+def schedule_result_previews(result: Dict[str, Any]) -> Optional[str]:
+    """
+    Queue preview generation for a stored result and return the job id. Results
+    without output images, or arriving while the queue is full, get None; the
+    `previews` CLI command backfills whatever was missed.
+    """
+    if not result.get("regular_output_url") and not result.get("thermal_output_url"):
+        return None
+    try:
+        return job_queue.submit("result_previews", result_previews_job, result).id
+    except QueueFullError as exc:
+        logger.warning(f"Previews for result {result['id']} not queued: {exc}")
+        return None
+
+
+async def backfill_result_previews(batch_size: int = 50) -> Dict[str, int]:
+    """Generate previews for every inference result that doesn't have them yet."""
+    processed = failed = 0
+    last_id: Optional[str] = None
+    while True:
+        query = (
+            supabase_admin
+            .table("inference_results")
+            .select("id,regular_output_url,thermal_output_url")
+            .is_("regular_thumbnail_url", "null")
+            .order("id", desc=False)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = (await call_supabase("inference_results.previews_backlog", query.execute, idempotent=True)).data or []
+        if not rows:
+            return {"processed": processed, "failed": failed}
+        for row in rows:
+            outcome = await process_result_previews(row)
+            if outcome["has_error"]:
+                failed += 1
+            else:
+                processed += 1
+        last_id = rows[-1]["id"]
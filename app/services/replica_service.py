@@ -0,0 +1,476 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+from app.core.resilience import call_supabase, UpstreamError
+from app.core.logging import get_logger
+
+logger = get_logger('replica')
+
+RESULT_FIELDS = (
+    "id", "created_at", "captured_at", "regular_result", "thermal_result", "fused_confidence", "fusion_decision",
+    "regular_output_url", "thermal_output_url", "regular_thumbnail_url", "thermal_thumbnail_url",
+    "thermal_preview_url",
+)
+SCAN_FIELDS = (
+    "id", "created_at", "farmer_id", "device_id", "scan_timestamp", "normal_image_path",
+    "thermal_image_path", "disease_score", "confidence_score",
+)
+JSON_FIELDS = {"regular_result", "thermal_result"}
+# Upstream tables mirrored locally and the columns pulled for each (scans.image_embedding is left out)
+TABLES = {"inference_results": RESULT_FIELDS, "scans": SCAN_FIELDS}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS inference_results (
+        id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        captured_at TEXT,
+        regular_result TEXT,
+        thermal_result TEXT,
+        fused_confidence REAL,
+        fusion_decision TEXT,
+        regular_output_url TEXT,
+        thermal_output_url TEXT,
+        regular_thumbnail_url TEXT,
+        thermal_thumbnail_url TEXT,
+        thermal_preview_url TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_inference_results_created_at ON inference_results (created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_inference_results_decision ON inference_results (fusion_decision, created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS scans (
+        id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        farmer_id TEXT,
+        device_id TEXT,
+        scan_timestamp TEXT,
+        normal_image_path TEXT,
+        thermal_image_path TEXT,
+        disease_score REAL,
+        confidence_score REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_scans_created_at ON scans (created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row TEXT NOT NULL,
+        queued_at TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        dead INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        table_name TEXT PRIMARY KEY,
+        watermark_created_at TEXT,
+        watermark_id TEXT,
+        synced_at TEXT
+    )
+    """,
+]
+# Columns added after the first release, for replicas created before them
+ADDED_COLUMNS = {
+    "inference_results": {"captured_at": "TEXT"},
+    "outbox": {"dead": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _to_sqlite(fields: Tuple[str, ...], row: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple(json.dumps(row.get(f)) if f in JSON_FIELDS and row.get(f) is not None else row.get(f) for f in fields)
+
+
+def _from_sqlite(row: sqlite3.Row) -> Dict[str, Any]:
+    return {key: json.loads(row[key]) if key in JSON_FIELDS and row[key] is not None else row[key] for key in row.keys()}
+
+
+class LocalReplica:
+    """
+    SQLite mirror of inference_results and scans for edge deployments that lose
+    connectivity.
+
+    A background loop pulls new upstream rows in (created_at, id) keyset order
+    from a per-table watermark, so each sync only transfers what is new. Results
+    created locally go into the replica and an outbox in one transaction and are
+    pushed upstream in batches once Supabase is reachable. While enabled, result
+    reads (list, single row, tree stats) are served from the replica.
+
+    created_at is stamped by the database when a row is inserted upstream, so a
+    result pushed after a week offline still lands past every other replica's
+    watermark; the local row carries a provisional created_at until its push
+    returns the real one. Device time is kept in captured_at. A row the database
+    rejects is retried on its own and then set aside (`dead`), so it can't block
+    the rows queued behind it.
+
+    Only inserts are followed upstream. Remote updates and deletes appear after
+    `python -m app.cli replica-sync --full`; changes made through this service are
+    applied to the replica directly.
+    """
+
+    def __init__(self, path: str, sync_interval: float, pull_batch_size: int, push_batch_size: int) -> None:
+        self.path = path
+        self.sync_interval = sync_interval
+        self.pull_batch_size = pull_batch_size
+        self.push_batch_size = push_batch_size
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+        self._schema_ready = False
+        self.last_sync_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.REPLICA_ENABLED
+
+    # -- connection -------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        # Work runs in asyncio.to_thread, so keep one connection per thread (and per process)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        with self._transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            for table, columns in ADDED_COLUMNS.items():
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for name, definition in columns.items():
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+        self._schema_ready = True
+
+    async def _db(self, fn, *args):
+        def run():
+            self._ensure_schema()
+            return fn(*args)
+        return await asyncio.to_thread(run)
+
+    # -- lifecycle --------------------------------------------------------
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        await self._db(lambda: None)
+        self._task = asyncio.create_task(self._run(), name="replica-sync")
+        logger.info(f"Local replica enabled at {self.path}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync_once()
+            except UpstreamError as exc:
+                # Expected while offline; local reads and writes keep working
+                self.last_error = str(exc)
+                logger.warning(f"Replica sync skipped, upstream unavailable: {exc}")
+            except Exception as exc:
+                self.last_error = str(exc)
+                logger.error(f"Replica sync failed: {exc}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync_once(self) -> Dict[str, int]:
+        """Push queued local results, then pull new upstream rows. Returns row counts."""
+        summary = {"pushed": await self.push_outbox()}
+        for table, fields in TABLES.items():
+            summary[table] = await self.pull(table, fields)
+        self.last_sync_at = _now()
+        self.last_error = None
+        return summary
+
+    def _reset(self) -> None:
+        with self._transaction() as conn:
+            for table in TABLES:
+                # Rows still waiting in the outbox exist only here; keep them
+                conn.execute(
+                    f"DELETE FROM {table} WHERE id NOT IN "
+                    "(SELECT json_extract(row, '$.id') FROM outbox WHERE table_name = ?)",
+                    (table,)
+                )
+            conn.execute("DELETE FROM sync_state")
+
+    async def reset(self) -> None:
+        """
+        Drop mirrored rows and watermarks so the next sync rebuilds the replica from
+        upstream, picking up remote updates and deletes. Reads are incomplete until it finishes.
+        """
+        await self._db(self._reset)
+
+    # -- pull -------------------------------------------------------------
+
+    def _fetch_page(self, table: str, fields: Tuple[str, ...], watermark: Optional[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        query = (
+            supabase_admin
+            .table(table)
+            .select(",".join(fields))
+            .order("created_at", desc=False)
+            .order("id", desc=False)
+            .limit(self.pull_batch_size)
+        )
+        if watermark is not None:
+            created_at, row_id = watermark
+            query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{row_id})')
+        return query.execute().data or []
+
+    def _watermark(self, table: str) -> Optional[Tuple[str, str]]:
+        row = self._connection().execute(
+            "SELECT watermark_created_at, watermark_id FROM sync_state WHERE table_name = ?", (table,)
+        ).fetchone()
+        return (row[0], row[1]) if row and row[0] else None
+
+    def _apply(self, table: str, fields: Tuple[str, ...], rows: List[Dict[str, Any]]) -> None:
+        placeholders = ",".join("?" * len(fields))
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({','.join(fields)}) VALUES ({placeholders})",
+                [_to_sqlite(fields, row) for row in rows]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (table_name, watermark_created_at, watermark_id, synced_at) VALUES (?, ?, ?, ?)",
+                (table, rows[-1]["created_at"], rows[-1]["id"], _now())
+            )
+
+    async def pull(self, table: str, fields: Tuple[str, ...]) -> int:
+        pulled = 0
+        watermark = await self._db(self._watermark, table)
+        if watermark is not None:
+            # created_at is the inserting transaction's start time, so a row can become
+            # visible just behind the watermark; re-read a short window (idempotent)
+            overlap = timedelta(seconds=settings.REPLICA_PULL_OVERLAP_SECONDS)
+            watermark = ((datetime.fromisoformat(watermark[0]) - overlap).isoformat(), watermark[1])
+        while True:
+            rows = await call_supabase(
+                f"{table}.replica_pull",
+                lambda watermark=watermark: self._fetch_page(table, fields, watermark),
+                idempotent=True
+            )
+            rows = [row for row in rows if row.get("created_at")]
+            if not rows:
+                break
+            await self._db(self._apply, table, fields, rows)
+            pulled += len(rows)
+            watermark = (rows[-1]["created_at"], rows[-1]["id"])
+            if len(rows) < self.pull_batch_size:
+                break
+        if pulled:
+            logger.info(f"Replica pulled {pulled} {table} rows")
+        return pulled
+
+    # -- push -------------------------------------------------------------
+
+    def _pending(self) -> List[Tuple[int, str, Dict[str, Any]]]:
+        rows = self._connection().execute(
+            "SELECT seq, table_name, row FROM outbox WHERE dead = 0 ORDER BY seq LIMIT ?", (self.push_batch_size,)
+        ).fetchall()
+        return [(row["seq"], row["table_name"], json.loads(row["row"])) for row in rows]
+
+    def _mark_pushed(self, table: str, seqs: List[int], rows: List[Dict[str, Any]]) -> None:
+        # Store the rows as upstream returned them, with their server-assigned created_at
+        fields = TABLES[table]
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs])
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({','.join(fields)}) VALUES ({','.join('?' * len(fields))})",
+                [_to_sqlite(fields, row) for row in rows if row.get("created_at")]
+            )
+
+    def _mark_failed(self, seqs: List[int], error: str, dead: bool = False) -> None:
+        self._connection().executemany(
+            "UPDATE outbox SET attempts = attempts + 1, last_error = ?, dead = ? WHERE seq = ?",
+            [(error, int(dead), seq) for seq in seqs]
+        )
+
+    async def _push_rows(self, table: str, items: List[Tuple[int, Dict[str, Any]]]) -> int:
+        """
+        Upsert one batch. If the database rejects it, retry row by row so one bad
+        row can't hold back the rest; a row rejected on its own is set aside.
+        """
+        seqs = [seq for seq, _ in items]
+        # Left out so the database stamps it (and an upsert retry keeps the first stamp)
+        payload = [{k: v for k, v in row.items() if k != "created_at"} for _, row in items]
+        try:
+            response = await call_supabase(
+                f"{table}.replica_push",
+                lambda: supabase_admin.table(table).upsert(payload, on_conflict="id").execute()
+            )
+            if hasattr(response, 'error') and response.error:
+                raise ValueError(str(response.error))
+        except UpstreamError as exc:
+            await self._db(self._mark_failed, seqs, str(exc))
+            raise
+        except Exception as exc:
+            if len(items) == 1:
+                await self._db(self._mark_failed, seqs, str(exc), True)
+                logger.error(f"Replica push of {table} row {payload[0].get('id')} rejected, set aside: {exc}")
+                return 0
+            logger.warning(f"Replica push of {len(items)} {table} rows rejected, retrying one by one: {exc}")
+            pushed = 0
+            for item in items:
+                pushed += await self._push_rows(table, [item])
+            return pushed
+        await self._db(self._mark_pushed, table, seqs, response.data or [])
+        return len(items)
+
+    async def push_outbox(self) -> int:
+        """Upsert queued rows upstream in batches, oldest first. Upsert on id makes retries safe."""
+        pushed = 0
+        while True:
+            pending = await self._db(self._pending)
+            if not pending:
+                break
+            by_table: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+            for seq, table, row in pending:
+                by_table.setdefault(table, []).append((seq, row))
+            for table, items in by_table.items():
+                pushed += await self._push_rows(table, items)
+            if len(pending) < self.push_batch_size:
+                break
+        if pushed:
+            logger.info(f"Replica pushed {pushed} queued rows upstream")
+        return pushed
+
+    def _requeue_dead(self) -> int:
+        return self._connection().execute("UPDATE outbox SET dead = 0 WHERE dead = 1").rowcount
+
+    async def requeue_dead(self) -> int:
+        """Put rows set aside after a rejection back in the queue, e.g. once the upstream schema is fixed."""
+        return await self._db(self._requeue_dead)
+
+    # -- local reads / writes ---------------------------------------------
+
+    def _enqueue(self, table: str, fields: Tuple[str, ...], row: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({','.join(fields)}) VALUES ({','.join('?' * len(fields))})",
+                _to_sqlite(fields, row)
+            )
+            conn.execute(
+                "INSERT INTO outbox (table_name, row, queued_at) VALUES (?, ?, ?)",
+                (table, json.dumps(row), _now())
+            )
+
+    async def enqueue_result(self, row: Dict[str, Any]) -> None:
+        """Store a locally created result and queue it for upstream insertion."""
+        await self._db(self._enqueue, "inference_results", RESULT_FIELDS, row)
+
+    def _list_results(self, limit: int, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT * FROM inference_results ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+        total = conn.execute("SELECT COUNT(*) FROM inference_results").fetchone()[0]
+        return [_from_sqlite(row) for row in rows], total
+
+    async def list_results(self, limit: int, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        return await self._db(self._list_results, limit, offset)
+
+    def _get_result(self, id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT * FROM inference_results WHERE id = ?", (id,)).fetchone()
+        return _from_sqlite(row) if row else None
+
+    async def get_result(self, id: str) -> Optional[Dict[str, Any]]:
+        return await self._db(self._get_result, id)
+
+    def _created_ats(self, fusion_decision: str) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT created_at FROM inference_results WHERE fusion_decision = ? ORDER BY created_at", (fusion_decision,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    async def result_created_ats(self, fusion_decision: str) -> List[str]:
+        return await self._db(self._created_ats, fusion_decision)
+
+    def _update_results(self, rows: List[Dict[str, Any]]) -> None:
+        with self._transaction() as conn:
+            for row in rows:
+                fields = [f for f in row if f in RESULT_FIELDS and f != "id"]
+                if fields:
+                    conn.execute(
+                        f"UPDATE inference_results SET {', '.join(f + ' = ?' for f in fields)} WHERE id = ?",
+                        _to_sqlite(tuple(fields), row) + (str(row["id"]),)
+                    )
+
+    async def update_results(self, rows: List[Dict[str, Any]]) -> None:
+        """Apply column updates (each row has an id plus the changed columns) made upstream by this service."""
+        await self._db(self._update_results, rows)
+
+    async def remove_result(self, id: str) -> None:
+        await self._db(lambda: self._connection().execute("DELETE FROM inference_results WHERE id = ?", (id,)))
+
+    def _status(self) -> Dict[str, Any]:
+        conn = self._connection()
+        outbox = conn.execute(
+            "SELECT COUNT(*), MIN(queued_at), COUNT(last_error) FROM outbox WHERE dead = 0"
+        ).fetchone()
+        dead = conn.execute("SELECT COUNT(*) FROM outbox WHERE dead = 1").fetchone()[0]
+        watermarks = {
+            row["table_name"]: row["watermark_created_at"]
+            for row in conn.execute("SELECT table_name, watermark_created_at FROM sync_state")
+        }
+        return {
+            "pending_push": outbox[0],
+            "oldest_pending": outbox[1],
+            "failed_push": outbox[2],
+            "dead_push": dead,
+            "watermarks": watermarks,
+        }
+
+    async def status(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "last_sync_at": self.last_sync_at,
+            "last_error": self.last_error,
+            **await self._db(self._status),
+        }
+
+
+replica = LocalReplica(
+    path=settings.REPLICA_SQLITE_PATH,
+    sync_interval=settings.REPLICA_SYNC_INTERVAL_SECONDS,
+    pull_batch_size=settings.REPLICA_PULL_BATCH_SIZE,
+    push_batch_size=settings.REPLICA_PUSH_BATCH_SIZE,
+)
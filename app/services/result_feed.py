@@ -0,0 +1,210 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+from app.core.resilience import call_supabase
+from app.core.logging import get_logger
+from app.services.inference_result_service import RESULT_COLUMNS
+
+logger = get_logger('result_feed')
+
+POLL_BATCH_SIZE = 500
+
+
+def _parse(created_at: str) -> datetime:
+    return datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+
+
+class FeedFullError(Exception):
+    pass
+
+
+class Subscription:
+    """
+    One client's view of the feed: a bounded buffer with drop-oldest semantics, so a
+    slow consumer loses its oldest undelivered results instead of stalling the fan-out.
+    """
+
+    def __init__(self, fusion_decision: Optional[str], min_confidence: Optional[float], maxsize: int) -> None:
+        self.fusion_decision = fusion_decision.lower() if fusion_decision else None
+        self.min_confidence = min_confidence
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        if self.fusion_decision and (row.get("fusion_decision") or "").lower() != self.fusion_decision:
+            return False
+        if self.min_confidence is not None and (row.get("fused_confidence") or 0.0) < self.min_confidence:
+            return False
+        return True
+
+    def push(self, row: Dict[str, Any]) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(row)
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> List[Dict[str, Any]]:
+        """Wait up to `timeout` seconds for buffered rows and return all of them."""
+        if not self._buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return []
+        rows = list(self._buffer)
+        self._buffer.clear()
+        return rows
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class ResultFeed:
+    """
+    Fans newly inserted inference results out to all subscribers of this worker.
+
+    A single upstream poller (started with the first subscriber, stopped with the
+    last) follows a created_at watermark, so upstream load is one small query per
+    interval no matter how many dashboards are open. created_at is the inserting
+    transaction's start time, so a row can commit just behind the watermark; each
+    poll re-reads `overlap` seconds behind it and skips ids already sent.
+    """
+
+    def __init__(self, poll_interval: float, buffer_size: int, max_subscribers: int, overlap: float = 5.0) -> None:
+        self._poll_interval = poll_interval
+        self._overlap = timedelta(seconds=overlap)
+        self._buffer_size = buffer_size
+        self._max_subscribers = max_subscribers
+        self._subscribers: Set[Subscription] = set()
+        self._poller: Optional[asyncio.Task] = None
+        self._watermark: Optional[datetime] = None
+        # id -> created_at of rows already sent that are still inside the overlap window
+        self._seen: Dict[str, datetime] = {}
+        self._started = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, fusion_decision: Optional[str] = None, min_confidence: Optional[float] = None) -> Subscription:
+        if len(self._subscribers) >= self._max_subscribers:
+            raise FeedFullError("Too many live feed subscribers")
+        subscription = Subscription(fusion_decision, min_confidence, self._buffer_size)
+        self._subscribers.add(subscription)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll(), name="result-feed-poller")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+            self._started = False
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+            self._started = False
+
+    def _fetch_latest(self) -> List[Dict[str, Any]]:
+        response = (
+            supabase_admin
+            .table("inference_results")
+            .select("id,created_at")
+            .order("created_at", desc=True)
+            .limit(POLL_BATCH_SIZE)
+            .execute()
+        )
+        return response.data or []
+
+    def _seed(self, rows: List[Dict[str, Any]]) -> None:
+        """Start from the newest existing row so only results inserted from now on are streamed."""
+        self._watermark = None
+        self._seen = {}
+        self._remember(rows)
+
+    def _fetch_since(self, since: Optional[datetime]) -> List[Dict[str, Any]]:
+        query = (
+            supabase_admin
+            .table("inference_results")
+            .select(RESULT_COLUMNS)
+            .order("created_at", desc=False)
+            .order("id", desc=False)
+            .limit(POLL_BATCH_SIZE)
+        )
+        if since is not None:
+            query = query.gte("created_at", since.isoformat())
+        return query.execute().data or []
+
+    def _remember(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            created_at = _parse(row["created_at"])
+            self._seen[row["id"]] = created_at
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+        if self._watermark is not None:
+            horizon = self._watermark - self._overlap
+            self._seen = {id: created_at for id, created_at in self._seen.items() if created_at >= horizon}
+
+    def _advance(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows not sent before, in order; moves the watermark and the seen window on."""
+        fresh = [row for row in rows if row["id"] not in self._seen]
+        self._remember(fresh)
+        return fresh
+
+    def _publish(self, rows: List[Dict[str, Any]]) -> None:
+        for row in self._advance(rows):
+            for subscription in list(self._subscribers):
+                if subscription.matches(row):
+                    subscription.push(row)
+
+    async def _poll_once(self) -> None:
+        # Upstream calls run in threads and may be hedged, so they only return rows;
+        # all feed state is changed here on the event loop
+        since = self._watermark - self._overlap if self._watermark is not None else None
+        while True:
+            rows = await call_supabase(
+                "inference_results.feed_poll",
+                lambda since=since: self._fetch_since(since),
+                idempotent=True
+            )
+            self._publish(rows)
+            if len(rows) < POLL_BATCH_SIZE or _parse(rows[-1]["created_at"]) == since:
+                return
+            since = _parse(rows[-1]["created_at"])
+
+    async def _poll(self) -> None:
+        logger.info("Result feed poller started")
+        try:
+            while True:
+                try:
+                    if not self._started:
+                        rows = await call_supabase("inference_results.feed_seed", self._fetch_latest, idempotent=True)
+                        self._seed(rows)
+                        self._started = True
+                        continue
+                    await asyncio.sleep(self._poll_interval)
+                    await self._poll_once()
+                except Exception as exc:
+                    logger.error(f"Result feed poll failed: {exc}")
+                    await asyncio.sleep(self._poll_interval)
+        except asyncio.CancelledError:
+            logger.info("Result feed poller stopped")
+            raise
+
+
+result_feed = ResultFeed(
+    poll_interval=settings.FEED_POLL_INTERVAL_SECONDS,
+    buffer_size=settings.FEED_CLIENT_BUFFER,
+    max_subscribers=settings.FEED_MAX_SUBSCRIBERS,
+    overlap=settings.FEED_OVERLAP_SECONDS,
+)
@@ -0,0 +1,184 @@
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import PurePath
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+from app.core.storage import storage, StorageWriter, StoredObject
+from app.core.resilience import call_supabase, UpstreamError
+from app.core.security import Principal
+from app.core.logging import get_logger
+
+logger = get_logger('scan_service')
+
+IMAGE_FIELDS = {"normal_image": "normal_image_path", "thermal_image": "thermal_image_path"}
+TEXT_FIELDS = ("farmer_id", "device_id", "scan_timestamp")
+ALLOWED_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp"}
+MAX_TEXT_FIELD_BYTES = 1024
+
+
+def _suffix_for(filename: Optional[str]) -> str:
+    suffix = PurePath(filename or "").suffix.lower()
+    return suffix if suffix in ALLOWED_SUFFIXES else ""
+
+
+class _ScanUploadParser:
+    """
+    Drives python-multipart's push parser from the raw request stream.
+
+    The parser callbacks only record events; they are drained after every chunk so
+    that image data can be awaited into storage writers. Only the current chunk is
+    ever held in memory.
+    """
+
+    def __init__(self, boundary: bytes) -> None:
+        self._events: List[Tuple[str, bytes]] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._field_name: Optional[str] = None
+        self._writer: Optional[StorageWriter] = None
+        self._suffix = ""
+        self._text = bytearray()
+
+        self.fields: Dict[str, str] = {}
+        self.images: Dict[str, StoredObject] = {}
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": lambda: self._events.append(("part_begin", b"")),
+            "on_part_data": lambda data, start, end: self._events.append(("part_data", data[start:end])),
+            "on_part_end": lambda: self._events.append(("part_end", b"")),
+            "on_header_field": lambda data, start, end: self._events.append(("header_field", data[start:end])),
+            "on_header_value": lambda data, start, end: self._events.append(("header_value", data[start:end])),
+            "on_header_end": lambda: self._events.append(("header_end", b"")),
+            "on_headers_finished": lambda: self._events.append(("headers_finished", b"")),
+        })
+
+    async def feed(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+        events, self._events = self._events, []
+        for event, data in events:
+            await self._handle(event, data)
+
+    async def finish(self) -> None:
+        self._parser.finalize()
+        events, self._events = self._events, []
+        for event, data in events:
+            await self._handle(event, data)
+
+    async def abort(self) -> None:
+        if self._writer is not None:
+            await self._writer.abort()
+            self._writer = None
+
+    async def _handle(self, event: str, data: bytes) -> None:
+        if event == "part_begin":
+            self._headers = {}
+            self._field_name = None
+            self._text = bytearray()
+        elif event == "header_field":
+            self._header_field += data
+        elif event == "header_value":
+            self._header_value += data
+        elif event == "header_end":
+            self._headers[self._header_field.lower()] = self._header_value
+            self._header_field = b""
+            self._header_value = b""
+        elif event == "headers_finished":
+            _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+            self._field_name = options.get(b"name", b"").decode("latin-1") or None
+            if self._field_name in IMAGE_FIELDS:
+                if self._field_name in self.images:
+                    raise HTTPException(status_code=400, detail=f"Duplicate part: {self._field_name}")
+                filename = options.get(b"filename", b"").decode("latin-1")
+                self._suffix = _suffix_for(filename)
+                self._writer = storage.open_writer()
+        elif event == "part_data":
+            if self._writer is not None:
+                if self._writer.size + len(data) > settings.UPLOAD_MAX_IMAGE_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"{self._field_name} exceeds {settings.UPLOAD_MAX_IMAGE_BYTES} bytes"
+                    )
+                await self._writer.write(data)
+            elif self._field_name in TEXT_FIELDS:
+                self._text += data
+                if len(self._text) > MAX_TEXT_FIELD_BYTES:
+                    raise HTTPException(status_code=400, detail=f"Field too long: {self._field_name}")
+        elif event == "part_end":
+            if self._writer is not None:
+                writer, self._writer = self._writer, None
+                if writer.size == 0:
+                    await writer.abort()
+                    raise HTTPException(status_code=400, detail=f"Empty image: {self._field_name}")
+                self.images[self._field_name] = await writer.commit("scans", self._suffix)
+            elif self._field_name in TEXT_FIELDS:
+                self.fields[self._field_name] = self._text.decode("utf-8")
+
+
+async def stream_scan_upload(request: Request, principal: Principal) -> Dict[str, Any]:
+    """
+    Stream a regular + thermal image pair from a multipart request into storage and
+    create the scans row once both parts have landed.
+
+    Expected parts: normal_image, thermal_image (files) and optional
+    farmer_id, device_id, scan_timestamp (text). Only admins may set farmer_id;
+    anyone else's scans are always recorded under their own id.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data with a boundary")
+
+    parser = _ScanUploadParser(boundary)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await parser.feed(chunk)
+        await parser.finish()
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logger.error(f"Error streaming scan upload: {exc}")
+        raise HTTPException(status_code=400, detail=f"Malformed upload: {exc}")
+    finally:
+        # finalize() doesn't raise on a truncated body, so a part can still be open
+        # here even on success; a disconnect or cancellation lands here too.
+        await parser.abort()
+
+    missing = [name for name in IMAGE_FIELDS if name not in parser.images]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing image parts: {', '.join(missing)}")
+
+    row: Dict[str, Any] = {column: parser.images[name].key for name, column in IMAGE_FIELDS.items()}
+    row.update({name: value for name, value in parser.fields.items() if value})
+    if principal.role != "admin":
+        row["farmer_id"] = principal.id
+    try:
+        response = await call_supabase("scans.insert", lambda: supabase_admin.table("scans").insert(row).execute())
+        if hasattr(response, 'error') and response.error:
+            logger.error(f"Supabase error creating scan: {response.error}")
+            raise HTTPException(status_code=500, detail=str(response.error))
+    except (HTTPException, UpstreamError):
+        raise
+    except Exception as exc:
+        logger.error(f"Exception creating scan row: {exc}")
+        raise HTTPException(status_code=500, detail="Error creating scan")
+
+    scan = response.data[0] if response.data else row
+    logger.info(
+        f"Scan {scan.get('id')} uploaded: "
+        + ", ".join(f"{name}={obj.size}B{' (dedup)' if obj.deduplicated else ''}" for name, obj in parser.images.items())
+    )
+    return {
+        "scan": scan,
+        "images": {
+            name: {
+                "path": obj.key,
+                "url": storage.url_for(obj.key),
+                "sha256": obj.sha256,
+                "size": obj.size,
+                "deduplicated": obj.deduplicated,
+            }
+            for name, obj in parser.images.items()
+        },
+    }
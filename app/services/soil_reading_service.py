@@ -0,0 +1,222 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timezone
+import numpy as np
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.supabase import supabase_admin
+from app.core.resilience import call_supabase, UpstreamError
+from app.core.logging import get_logger
+
+logger = get_logger('soil_reading_service')
+
+SOIL_METRICS = ("temperature", "moisture", "ph", "nitrogen", "phosphorus", "potassium")
+
+# PostgREST caps a single response at 1000 rows by default
+FETCH_PAGE_SIZE = 1000
+
+
+def _parse_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _to_iso(epoch_seconds: np.ndarray) -> List[str]:
+    return [datetime.fromtimestamp(float(ts), tz=timezone.utc).isoformat() for ts in epoch_seconds]
+
+
+def _round(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 4) for v in values]
+
+
+def _too_many_rows() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"More than {settings.SOIL_TIMESERIES_MAX_RAW_ROWS} readings in range; "
+               "narrow the range or use method=bucket"
+    )
+
+
+async def _fetch_buckets(start: datetime, end: datetime, points: int, metrics: Sequence[str]) -> List[List[Any]]:
+    """
+    Aggregate readings in [start, end] into `points` equal-width buckets inside
+    Postgres (public.soil_readings_buckets, see migrations). One round trip and
+    one indexed range scan, whatever the size of the range. Returns
+    [bucket, metric, min, max, avg, count] rows ordered by bucket.
+    """
+    response = await call_supabase(
+        "soil_readings.buckets",
+        lambda: supabase_admin.rpc("soil_readings_buckets", {
+            "start_ts": start.isoformat(),
+            "end_ts": end.isoformat(),
+            "buckets": points,
+            "metrics": list(metrics),
+        }).execute(),
+        idempotent=True
+    )
+    if hasattr(response, 'error') and response.error:
+        raise ValueError(str(response.error))
+    return response.data or []
+
+
+async def _fetch_readings(start: datetime, end: datetime, metrics: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Fetch the raw readings in [start, end] ordered by (reading_timestamp, id), paging
+    on that key so every page is an index seek (idx_soil_readings_reading_timestamp_id).
+    Ranges holding more than SOIL_TIMESERIES_MAX_RAW_ROWS are refused with a 400 after
+    an exact count, before any rows are loaded.
+    """
+    counted = await call_supabase(
+        "soil_readings.count",
+        lambda: (
+            supabase_admin
+            .table("soil_readings")
+            .select("id", count="exact")
+            .gte("reading_timestamp", start.isoformat())
+            .lte("reading_timestamp", end.isoformat())
+            .limit(1)
+            .execute()
+        ),
+        idempotent=True
+    )
+    if hasattr(counted, 'error') and counted.error:
+        raise ValueError(str(counted.error))
+    if (counted.count or 0) > settings.SOIL_TIMESERIES_MAX_RAW_ROWS:
+        raise _too_many_rows()
+
+    columns = ",".join(("id", "reading_timestamp", *metrics))
+    rows: List[Dict[str, Any]] = []
+    after: Optional[Tuple[str, str]] = None
+    while True:
+        query = (
+            supabase_admin
+            .table("soil_readings")
+            .select(columns)
+            .gte("reading_timestamp", start.isoformat())
+            .lte("reading_timestamp", end.isoformat())
+            .order("reading_timestamp", desc=False)
+            .order("id", desc=False)
+            .limit(FETCH_PAGE_SIZE)
+        )
+        if after is not None:
+            ts, row_id = after
+            query = query.or_(f'reading_timestamp.gt."{ts}",and(reading_timestamp.eq."{ts}",id.gt.{row_id})')
+        response = await call_supabase("soil_readings.range", query.execute, idempotent=True)
+        if hasattr(response, 'error') and response.error:
+            raise ValueError(str(response.error))
+        page = response.data or []
+        rows.extend(page)
+        # Readings inserted after the count can still push the range over the cap
+        if len(rows) > settings.SOIL_TIMESERIES_MAX_RAW_ROWS:
+            raise _too_many_rows()
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        after = (page[-1]["reading_timestamp"], page[-1]["id"])
+
+
+def _to_arrays(rows: List[Dict[str, Any]], metrics: Sequence[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Convert rows into a timestamp array (epoch seconds) and one float array per metric.
+    Missing values become NaN so the aggregations below can mask them out.
+    """
+    timestamps = np.fromiter(
+        (_parse_timestamp(row["reading_timestamp"]) for row in rows),
+        dtype=np.float64,
+        count=len(rows),
+    )
+    values = {
+        metric: np.array(
+            [np.nan if row.get(metric) is None else row[metric] for row in rows],
+            dtype=np.float64,
+        )
+        for metric in metrics
+    }
+    return timestamps, values
+
+
+def format_buckets(
+    rows: List[List[Any]],
+    start: float,
+    end: float,
+    points: int,
+    metrics: Sequence[str],
+) -> Dict[str, Dict[str, List[Any]]]:
+    """
+    Turn soil_readings_buckets rows into one {timestamps, min, max, avg, count}
+    series per metric. Empty buckets are omitted; timestamps are bucket starts.
+    """
+    width = (end - start) / points
+    series = {metric: {"timestamps": [], "min": [], "max": [], "avg": [], "count": []} for metric in metrics}
+    for bucket, metric, min_value, max_value, avg_value, count in rows:
+        out = series.get(metric)
+        if out is None:
+            continue
+        out["timestamps"].append(datetime.fromtimestamp(start + bucket * width, tz=timezone.utc).isoformat())
+        out["min"].append(round(float(min_value), 4))
+        out["max"].append(round(float(max_value), 4))
+        out["avg"].append(round(float(avg_value), 4))
+        out["count"].append(int(count))
+    return series
+
+
+def lttb_downsample(timestamps: np.ndarray, values: np.ndarray, points: int) -> Dict[str, List[Any]]:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Keeps the first and last points and,
+    for each bucket in between, the point forming the largest triangle with the
+    previously selected point and the average of the next bucket.
+    """
+    valid = ~np.isnan(values)
+    ts, vs = timestamps[valid], values[valid]
+    n = ts.size
+    if n <= points or points < 3:
+        return {"timestamps": _to_iso(ts), "values": _round(vs)}
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo = hi
+        next_hi = edges[i + 2] if i + 2 < edges.size else n
+        avg_t = ts[next_lo:next_hi].mean()
+        avg_v = vs[next_lo:next_hi].mean()
+        area = np.abs(
+            (ts[a] - avg_t) * (vs[lo:hi] - vs[a])
+            - (ts[a] - ts[lo:hi]) * (avg_v - vs[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return {"timestamps": _to_iso(ts[selected]), "values": _round(vs[selected])}
+
+
+async def get_soil_timeseries(
+    start: datetime,
+    end: datetime,
+    points: int = 500,
+    method: str = "bucket",
+    metrics: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Returns server-side downsampled series for each requested soil metric in [start, end].
+    method: 'bucket' (min/max/avg per time bucket) or 'lttb' (shape-preserving point selection)
+    """
+    metrics = list(metrics or SOIL_METRICS)
+    base = {"start": start.isoformat(), "end": end.isoformat(), "points": points, "method": method}
+    try:
+        if method == "lttb":
+            rows = await _fetch_readings(start, end, metrics)
+            timestamps, values = _to_arrays(rows, metrics)
+            series = {metric: lttb_downsample(timestamps, values[metric], points) for metric in metrics}
+            raw_count = len(rows)
+        else:
+            buckets = await _fetch_buckets(start, end, points, metrics)
+            series = format_buckets(buckets, start.timestamp(), end.timestamp(), points, metrics)
+            raw_count = max((sum(s["count"]) for s in series.values()), default=0)
+        logger.info(f"Soil timeseries ({method}) for {start} - {end}: raw={raw_count}, points={points}")
+        return {**base, "raw_count": raw_count, "series": series, "has_error": False, "error": None}
+    except (HTTPException, UpstreamError):
+        raise
+    except Exception as exc:
+        logger.error(f"Exception in get_soil_timeseries: {exc}")
+        return {**base, "raw_count": 0, "series": {}, "has_error": True, "error": str(exc)}
@@ -1,31 +1,91 @@
 from typing import Optional, Dict, Any
 from app.core.supabase import supabase, supabase_admin
 from app.schemas.user import User
+from app.core.tasks import Job
+from app.core.resilience import call_supabase, UpstreamError
+from app.core.security import invalidate_user
+from app.core.cache import get_cache
+from app.core.config import settings
+
+_user_search_cache = get_cache("users.search", ttl=settings.USER_SEARCH_CACHE_SECONDS)
+
+
+def invalidate_user_search() -> None:
+    """Drop cached user listings after a profile is created or removed."""
+    _user_search_cache.clear()
 
 async def delete_user_from_supabase(user_id: str) -> Dict[str, Any]:
     if not user_id:
         return {"success": False, "error": "user_id is required"}
     # Delete from profiles first
     try:
-        profile_resp = supabase.table("profiles").delete().eq("id", user_id).execute()
+        profile_resp = await call_supabase(
+            "profiles.delete",
+            lambda: supabase.table("profiles").delete().eq("id", user_id).execute()
+        )
         if hasattr(profile_resp, 'error') and profile_resp.error:
             return {"success": False, "error": f"profiles: {profile_resp.error}"}
     except Exception as e:
         return {"success": False, "error": f"profiles: {str(e)}"}
+    invalidate_user(user_id, deleted=True)
+    invalidate_user_search()
     # Delete from auth.users using admin client
     try:
-        admin_resp = supabase_admin.auth.admin.delete_user(user_id)
+        admin_resp = await call_supabase(
+            "auth.admin.delete_user",
+            lambda: supabase_admin.auth.admin.delete_user(user_id)
+        )
         # For some supabase-py versions, admin_resp may not have error, so just check for exception
     except Exception as e:
         return {"success": False, "error": f"auth.users: {str(e)}"}
     return {"success": True, "error": None}
 
+async def set_user_role(user_id: str, role: str) -> Dict[str, Any]:
+    """
+    Grant a role. It is written to the auth user's app_metadata, which only the
+    service key can change and which get_current_principal trusts; the profile
+    row is updated to match for listings. Takes effect on the user's next token.
+    """
+    try:
+        await call_supabase(
+            "auth.admin.update_user_by_id",
+            lambda: supabase_admin.auth.admin.update_user_by_id(user_id, {"app_metadata": {"role": role}})
+        )
+        profile_resp = await call_supabase(
+            "profiles.update_role",
+            lambda: supabase_admin.table("profiles").update({"role": role}).eq("id", user_id).execute()
+        )
+        if hasattr(profile_resp, 'error') and profile_resp.error:
+            return {"success": False, "error": f"profiles: {profile_resp.error}"}
+    except UpstreamError:
+        raise
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    invalidate_user(user_id)
+    invalidate_user_search()
+    return {"success": True, "error": None}
+
+async def delete_user_job(job: Job, user_id: str) -> Dict[str, Any]:
+    """
+    Job wrapper around delete_user_from_supabase; raising lets the queue retry.
+    Both steps are idempotent, so a retry after a partial failure is safe.
+    """
+    job.set_progress(0.0, f"Deleting user {user_id}")
+    result = await delete_user_from_supabase(user_id)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    return {"user_id": user_id}
+
 async def fetch_users_from_supabase(
     limit: int = 10,
     offset: int = 0,
     search: Optional[str] = None
 ) -> Dict[str, Any]:
     import logging
+    cache_key = (limit, offset, search or "")
+    cached = _user_search_cache.get(cache_key)
+    if cached is not None:
+        return cached
     query = supabase.table("profiles")
     if search:
         # Search on email, first_name, or last_name (case-insensitive, partial match)
@@ -34,13 +94,15 @@ async def fetch_users_from_supabase(
         )
     try:
         query = query.select("*").range(offset, offset + limit - 1)
-        response = query.execute()
+        response = await call_supabase("profiles.list", query.execute, idempotent=True)
     except AttributeError as e:
         import logging
         logging.error(f"Supabase query does not support .range: {e}")
-        response = query.select("*").execute()  # fallback: no pagination
+        response = await call_supabase("profiles.list", query.select("*").execute, idempotent=True)  # fallback: no pagination
     if hasattr(response, 'error') and response.error:
         return {"users": [], "total": 0, "error": str(response.error)}
     users = response.data or []
     total = len(users)
-    return {"users": users, "total": total, "error": None}
+    result = {"users": users, "total": total, "error": None}
+    _user_search_cache.set(cache_key, result)
+    return result
@@ -0,0 +1,7 @@
+import os
+
+# app.core.config requires these and app.core.supabase builds clients from them
+# at import time; no request is made until a test calls out.
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test.anon.key")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "test.service.key")
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+
+from app.core import admission
+from app.core.admission import AdmissionControlMiddleware, TokenBucketLimiter, _user_id
+
+SECRET = "test-jwt-secret-at-least-32-bytes-long"
+
+
+def _token(sub: str, secret: str = SECRET) -> str:
+    return jwt.encode({"sub": sub, "aud": "authenticated", "exp": time.time() + 60}, secret, algorithm="HS256")
+
+
+def _scope(path: str = "/api/v1/inference-results/", token: str = None, ip: str = "10.0.0.1"):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return {"type": "http", "method": "GET", "path": path, "headers": headers, "client": (ip, 1234)}
+
+
+def test_token_bucket_allows_burst_then_limits(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    limiter = TokenBucketLimiter(rate=1.0, burst=3)
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") == pytest.approx(1.0)
+    assert limiter.acquire("b") == 0.0  # separate bucket
+    now[0] += 1.0
+    assert limiter.acquire("a") == 0.0
+
+
+def test_user_id_requires_verified_signature(monkeypatch):
+    monkeypatch.setattr(admission.settings, "SUPABASE_JWT_SECRET", SECRET)
+    assert _user_id(_scope(token=_token("user-1"))) == "user-1"
+    assert _user_id(_scope(token=_token("forged", secret="other-secret-at-least-32-bytes-long"))) is None
+    assert _user_id(_scope(token="not-a-jwt")) is None
+
+
+def test_user_id_unused_without_secret(monkeypatch):
+    monkeypatch.setattr(admission.settings, "SUPABASE_JWT_SECRET", None)
+    assert _user_id(_scope(token=_token("user-1"))) is None
+
+
+def _call(middleware, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+@pytest.fixture
+def middleware(monkeypatch):
+    monkeypatch.setattr(admission.settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission.settings, "ADMISSION_DEFAULT_RATE_PER_MINUTE", 60.0)
+    monkeypatch.setattr(admission.settings, "ADMISSION_DEFAULT_BURST", 2)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return AdmissionControlMiddleware(app)
+
+
+def test_forged_subjects_share_the_ip_bucket(middleware, monkeypatch):
+    monkeypatch.setattr(admission.settings, "SUPABASE_JWT_SECRET", SECRET)
+    statuses = [_call(middleware, _scope(token=_token(f"user-{i}", secret="forged-secret-at-least-32-bytes-long"))) for i in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+def test_verified_users_get_their_own_bucket(middleware, monkeypatch):
+    monkeypatch.setattr(admission.settings, "SUPABASE_JWT_SECRET", SECRET)
+    statuses = [_call(middleware, _scope(token=_token(f"user-{i}"))) for i in range(3)]
+    assert statuses == [200, 200, 200]
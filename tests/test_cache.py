@@ -0,0 +1,63 @@
+import sqlite3
+import time
+
+from app.core import cache
+from app.core.cache import MemoryCache, SQLiteCache
+
+
+def test_memory_cache_expiry_and_lru(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    store = MemoryCache(ttl=10, max_entries=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)  # evicts "b", the least recently used
+    assert store.get("b") is None
+    assert store.get("a") == 1
+    now[0] = 11
+    assert store.get("a", "gone") == "gone"
+
+
+def test_sqlite_cache_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    writer = SQLiteCache(path, "ns", ttl=60)
+    reader = SQLiteCache(path, "ns", ttl=60)
+    other = SQLiteCache(path, "other", ttl=60)
+    writer.set(("k", 1), {"v": [1, 2]})
+    assert reader.get(("k", 1)) == {"v": [1, 2]}
+    assert other.get(("k", 1)) is None
+    writer.clear()
+    assert reader.get(("k", 1)) is None
+
+
+def test_sqlite_cache_write_lock_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache.settings, "CACHE_SQLITE_BUSY_TIMEOUT_SECONDS", 0.01)
+    path = str(tmp_path / "cache.db")
+    store = SQLiteCache(path, "ns", ttl=60)
+    store.set("k", "v")
+
+    # Another worker process in the middle of a write
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        store.set("k", "new")
+        store.delete("k")
+        store.clear()
+        assert store.get("k") == "v"  # WAL readers aren't blocked by the writer
+        assert time.perf_counter() - started < 1.0
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+
+
+def test_sqlite_cache_read_lock_is_a_miss(tmp_path, monkeypatch):
+    store = SQLiteCache(str(tmp_path / "cache.db"), "ns", ttl=60)
+    store.set("k", "v")
+
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_connection", locked)
+    assert store.get("k", "miss") == "miss"
@@ -0,0 +1,71 @@
+import asyncio
+import gzip
+
+import pytest
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br" if compression.brotli else "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "br" if compression.brotli else "gzip"),
+    ("*, gzip;q=0", "br" if compression.brotli else None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def _run(app, content_type, body, accept="gzip", chunks=1):
+    sent = []
+
+    async def downstream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        size = len(body) // chunks + 1
+        parts = [body[i:i + size] for i in range(0, len(body), size)]
+        for i, part in enumerate(parts):
+            await send({"type": "http.response.body", "body": part, "more_body": i < len(parts) - 1})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(app(downstream)(scope, None, send))
+    headers = dict(sent[0]["headers"])
+    return headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def _middleware(minimum_size=100):
+    return lambda downstream: CompressionMiddleware(downstream, minimum_size=minimum_size)
+
+
+def test_large_json_is_gzipped_with_length():
+    body = b'{"values": [' + b"1, " * 1000 + b"1]}"
+    headers, payload = _run(_middleware(), b"application/json", body)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(payload)
+    assert gzip.decompress(payload) == body
+
+
+def test_streamed_body_is_compressed_incrementally():
+    body = b'{"row": 1}\n' * 500
+    headers, payload = _run(_middleware(), b"application/x-ndjson", body, chunks=5)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert gzip.decompress(payload) == body
+
+
+@pytest.mark.parametrize("content_type, body", [
+    (b"application/json", b'{"ok": true}'),  # under the minimum size
+    (b"text/event-stream", b"data: x\n\n" * 100),
+    (b"image/png", b"\x89PNG" * 100),
+])
+def test_passthrough(content_type, body):
+    headers, payload = _run(_middleware(), content_type, body)
+    assert b"content-encoding" not in headers
+    assert payload == body
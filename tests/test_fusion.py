@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import fusion_service
+from app.services.fusion_service import extract_infected_probability, fuse, refuse_batch
+
+
+@pytest.mark.parametrize("result, expected", [
+    (0.8, 0.8),
+    ({"label": "infected", "confidence": 0.9}, 0.9),
+    ({"label": "Healthy", "score": 0.9}, pytest.approx(0.1)),
+    ([{"label": "healthy", "confidence": 0.7}, {"label": "sigatoka", "confidence": 0.6}], 0.6),
+])
+def test_extract_infected_probability(result, expected):
+    assert extract_infected_probability(result) == expected
+
+
+@pytest.mark.parametrize("result", [None, "infected", {"label": "infected"}, [], True])
+def test_extract_unusable_outputs_are_nan(result):
+    assert np.isnan(extract_infected_probability(result))
+
+
+def test_fuse_renormalises_missing_modality():
+    confidence, is_infected, valid = fuse(
+        np.array([0.8, np.nan, np.nan]), np.array([0.4, 0.2, np.nan]),
+        regular_weight=0.5, thermal_weight=0.5, threshold=0.5,
+    )
+    assert confidence[0] == pytest.approx(0.6) and is_infected[0]
+    assert confidence[1] == pytest.approx(0.8) and not is_infected[1]
+    assert valid.tolist() == [True, True, False]
+
+
+def test_refuse_batch_skips_unparseable_modalities():
+    rows = [
+        {"id": "a", "regular_result": 0.9, "thermal_result": None},
+        {"id": "b", "regular_result": 0.9, "thermal_result": {"label": "infected", "unexpected": 1}},
+        {"id": "c", "regular_result": 0.9, "thermal_result": 0.9,
+         "fused_confidence": 0.9, "fusion_decision": "infected"},
+    ]
+    updates, flips, skipped = refuse_batch(rows)
+    assert [u["id"] for u in updates] == ["a"]
+    assert updates[0]["fusion_decision"] == "infected"
+    assert flips == {"none->infected": 1}
+    assert skipped == 1
+
+
+def test_refuse_all_results_sends_only_fused_columns(monkeypatch):
+    rows = [
+        {"id": "a", "created_at": "2024-01-01T00:00:00+00:00", "regular_result": 0.2, "thermal_result": 0.2,
+         "fused_confidence": 0.5, "fusion_decision": "infected"},
+        {"id": "b", "created_at": "2024-01-01T00:00:00+00:00", "regular_result": "garbled", "thermal_result": 0.9,
+         "fused_confidence": None, "fusion_decision": None},
+    ]
+    rpc_calls = []
+
+    class Query:
+        def __init__(self):
+            self.after = None
+
+        def select(self, *args, **kwargs):
+            return self
+
+        def order(self, *args, **kwargs):
+            return self
+
+        def limit(self, *args):
+            return self
+
+        def gt(self, column, value):
+            self.after = value
+            return self
+
+        def execute(self):
+            data = [] if self.after else rows
+            return SimpleNamespace(data=data, count=len(rows), error=None)
+
+    class Admin:
+        def table(self, name):
+            return Query()
+
+        def rpc(self, name, params):
+            rpc_calls.append((name, params))
+            return SimpleNamespace(execute=lambda: SimpleNamespace(data=None, error=None))
+
+    async def run_now(operation, fn, **kwargs):
+        return fn()
+
+    monkeypatch.setattr(fusion_service, "supabase_admin", Admin())
+    monkeypatch.setattr(fusion_service, "call_supabase", run_now)
+    monkeypatch.setattr(fusion_service.settings, "REPLICA_ENABLED", False)
+
+    summary = asyncio.run(fusion_service.refuse_all_results(batch_size=10))
+
+    assert rpc_calls == [(
+        "apply_fusion_updates",
+        {"changes": [{"id": "a", "fused_confidence": 0.8, "fusion_decision": "healthy"}]},
+    )]
+    assert summary["scanned"] == 2
+    assert summary["changed"] == 1
+    assert summary["skipped"] == 1
+    assert summary["flips"] == {"infected->healthy": 1}
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+from app.schemas.inference_result import InferenceResultCreate
+from app.services import inference_result_service, preview_service
+
+
+class Table:
+    """inference_results with upsert(ignore_duplicates) semantics."""
+
+    def __init__(self):
+        self.rows = {}
+        self.upserts = []
+        self._op = None
+
+    def upsert(self, row, on_conflict="", ignore_duplicates=False):
+        self.upserts.append((on_conflict, ignore_duplicates))
+        self._op = ("upsert", row)
+        return self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, column, value):
+        self._op = ("get", value)
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def execute(self):
+        op, arg = self._op
+        if op == "upsert":
+            if arg["id"] in self.rows:
+                return SimpleNamespace(data=[], error=None)
+            self.rows[arg["id"]] = {**arg, "created_at": "2024-01-01T00:00:00+00:00"}
+            return SimpleNamespace(data=[self.rows[arg["id"]]], error=None)
+        return SimpleNamespace(data=[self.rows[arg]] if arg in self.rows else [], error=None)
+
+
+def test_create_is_idempotent_and_queues_previews_once(monkeypatch):
+    table = Table()
+    scheduled = []
+
+    async def run_now(operation, fn, **kwargs):
+        return fn()
+
+    monkeypatch.setattr(inference_result_service, "supabase_admin", SimpleNamespace(table=lambda name: table))
+    monkeypatch.setattr(inference_result_service, "call_supabase", run_now)
+    monkeypatch.setattr(inference_result_service.settings, "REPLICA_ENABLED", False)
+    monkeypatch.setattr(preview_service, "schedule_result_previews", lambda row: scheduled.append(row["id"]))
+
+    payload = InferenceResultCreate(
+        id=uuid4(), regular_result=0.9, thermal_result=0.8,
+        fused_confidence=0.85, fusion_decision="infected", regular_output_url="scans/ab/a.png",
+    )
+    first = asyncio.run(inference_result_service.create_inference_result(payload))
+    retry = asyncio.run(inference_result_service.create_inference_result(payload))
+
+    assert not first["has_error"] and not retry["has_error"]
+    assert str(retry["data"].id) == str(payload.id)
+    assert retry["data"].created_at == first["data"].created_at
+    assert table.upserts == [("id", True), ("id", True)]
+    assert scheduled == [str(payload.id)]
+
+
+def test_schedule_result_previews(monkeypatch):
+    submitted = []
+
+    class Queue:
+        full = False
+
+        def submit(self, name, func, *args, **kwargs):
+            if self.full:
+                raise preview_service.QueueFullError("Job queue is full")
+            submitted.append((name, func, args))
+            return SimpleNamespace(id="job-1")
+
+    queue = Queue()
+    monkeypatch.setattr(preview_service, "job_queue", queue)
+
+    assert preview_service.schedule_result_previews({"id": "r1"}) is None
+    row = {"id": "r2", "thermal_output_url": "scans/ab/t.png"}
+    assert preview_service.schedule_result_previews(row) == "job-1"
+    assert submitted == [("result_previews", preview_service.result_previews_job, (row,))]
+    queue.full = True
+    assert preview_service.schedule_result_previews(row) is None
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.core.security import Principal
+from app.core.storage import LocalStorageBackend
+from app.routers import scans
+from app.services import preview_service
+
+
+@pytest.fixture
+def storage_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_service, "storage", LocalStorageBackend(str(tmp_path)))
+    # Render in threads; the spawned process pool is too slow to start per test
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(preview_service, "get_executor", lambda: executor)
+    yield tmp_path
+    executor.shutdown(wait=True)
+
+
+def _image(root, key, mode="RGB"):
+    path = root / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new(mode, (64, 32), 128).save(path)
+    return key
+
+
+def test_scan_previews_job_writes_next_to_originals(storage_root):
+    normal = _image(storage_root, "scans/ab/normal.png")
+    thermal = _image(storage_root, "scans/cd/thermal.png", mode="L")
+
+    outputs = asyncio.run(preview_service.scan_previews_job(SimpleNamespace(), "scan-1", normal, thermal))
+
+    assert outputs == {
+        "regular_thumbnail": "scans/ab/normal_thumb.jpg",
+        "thermal_thumbnail": "scans/cd/thermal_thumb.jpg",
+        "thermal_preview": "scans/cd/thermal_preview.jpg",
+    }
+    with Image.open(storage_root / outputs["regular_thumbnail"]) as thumb:
+        assert thumb.size == (preview_service.settings.THUMBNAIL_SIZE,) * 2
+    assert (storage_root / outputs["thermal_preview"]).exists()
+
+
+def test_scan_previews_job_raises_so_the_queue_retries(storage_root):
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(preview_service.scan_previews_job(SimpleNamespace(), "scan-1", "scans/missing.png", None))
+
+
+def test_result_previews_job_stores_urls(storage_root, monkeypatch):
+    updates = []
+
+    class Table:
+        def update(self, values):
+            updates.append(values)
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def execute(self):
+            return SimpleNamespace(data=[], error=None)
+
+    async def run_now(operation, fn, **kwargs):
+        return fn()
+
+    monkeypatch.setattr(preview_service, "supabase_admin", SimpleNamespace(table=lambda name: Table()))
+    monkeypatch.setattr(preview_service, "call_supabase", run_now)
+    monkeypatch.setattr(preview_service.settings, "REPLICA_ENABLED", False)
+    regular = _image(storage_root, "results/ab/regular.png")
+
+    stored = asyncio.run(preview_service.result_previews_job(
+        SimpleNamespace(), {"id": "r1", "regular_output_url": str(storage_root / regular)}
+    ))
+
+    assert updates == [stored]
+    assert stored["regular_thumbnail_url"] == str(storage_root / "results/ab/regular_thumb.jpg")
+    assert stored["thermal_thumbnail_url"] is None
+    with pytest.raises(RuntimeError):
+        asyncio.run(preview_service.result_previews_job(SimpleNamespace(), {"id": "r2", "regular_output_url": "results/missing.png"}))
+
+
+def test_upload_queues_previews_instead_of_holding_the_request(monkeypatch):
+    submitted = []
+
+    async def fake_upload(request, principal):
+        return {
+            "scan": {"id": "scan-1"},
+            "images": {"normal_image": {"path": "scans/a.png"}, "thermal_image": {"path": "scans/b.png"}},
+        }
+
+    def submit(name, func, *args, **kwargs):
+        submitted.append((name, func, args))
+        return SimpleNamespace(id="job-1")
+
+    monkeypatch.setattr(scans, "stream_scan_upload", fake_upload)
+    monkeypatch.setattr(preview_service, "job_queue", SimpleNamespace(submit=submit))
+
+    result = asyncio.run(scans.upload_scan(SimpleNamespace(), Principal(id="farmer-1", email=None, role="farmer")))
+
+    assert result["preview_job_id"] == "job-1"
+    assert submitted == [("scan_previews", preview_service.scan_previews_job, ("scan-1", "scans/a.png", "scans/b.png"))]
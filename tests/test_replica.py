@@ -0,0 +1,122 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.core.resilience import UpstreamUnavailableError
+from app.services import replica_service
+from app.services.replica_service import LocalReplica
+
+SERVER_TIME = "2030-01-01T00:00:00+00:00"
+
+
+class FakeUpstream:
+    """inference_results upsert that stamps created_at and rejects rows marked bad."""
+
+    def __init__(self):
+        self.batches = []
+        self.down = False
+
+    def table(self, name):
+        return self
+
+    def upsert(self, payload, on_conflict):
+        self.batches.append([row["id"] for row in payload])
+
+        def execute():
+            if self.down:
+                raise UpstreamUnavailableError("offline")
+            if any(row.get("fusion_decision") == "bad" for row in payload):
+                raise APIError({"message": "violates check constraint", "code": "23514", "hint": None, "details": None})
+            assert all("created_at" not in row for row in payload)
+            return SimpleNamespace(data=[{**row, "created_at": SERVER_TIME} for row in payload], error=None)
+
+        return SimpleNamespace(execute=execute)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = FakeUpstream()
+
+    async def run_now(operation, fn, **kwargs):
+        return fn()
+
+    monkeypatch.setattr(replica_service, "supabase_admin", fake)
+    monkeypatch.setattr(replica_service, "call_supabase", run_now)
+    return fake
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    monkeypatch.setattr(replica_service.settings, "REPLICA_ENABLED", True)
+    return LocalReplica(str(tmp_path / "replica.db"), sync_interval=60, pull_batch_size=100, push_batch_size=10)
+
+
+def _result(id, decision="healthy"):
+    return {"id": id, "created_at": "2020-01-01T00:00:00+00:00", "captured_at": "2020-01-01T00:00:00+00:00",
+            "fusion_decision": decision}
+
+
+def _enqueue(replica, *rows):
+    for row in rows:
+        asyncio.run(replica.enqueue_result(row))
+
+
+def test_push_stamps_created_at_from_upstream(replica, upstream):
+    _enqueue(replica, _result("a"))
+    assert asyncio.run(replica.push_outbox()) == 1
+    stored = asyncio.run(replica.get_result("a"))
+    assert stored["created_at"] == SERVER_TIME
+    assert stored["captured_at"] == "2020-01-01T00:00:00+00:00"
+    assert asyncio.run(replica.status())["pending_push"] == 0
+
+
+def test_rejected_row_is_set_aside(replica, upstream):
+    _enqueue(replica, _result("a"), _result("b", decision="bad"), _result("c"))
+
+    assert asyncio.run(replica.push_outbox()) == 2
+    assert upstream.batches == [["a", "b", "c"], ["a"], ["b"], ["c"]]
+    status = asyncio.run(replica.status())
+    assert (status["pending_push"], status["dead_push"]) == (0, 1)
+
+    # Later pushes aren't blocked by, and don't retry, the rejected row
+    _enqueue(replica, _result("d"))
+    upstream.batches.clear()
+    assert asyncio.run(replica.push_outbox()) == 1
+    assert upstream.batches == [["d"]]
+
+    assert asyncio.run(replica.requeue_dead()) == 1
+    assert asyncio.run(replica.status())["pending_push"] == 1
+
+
+def test_unreachable_upstream_keeps_rows_queued(replica, upstream):
+    _enqueue(replica, _result("a"), _result("b"))
+    upstream.down = True
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(replica.push_outbox())
+    assert upstream.batches == [["a", "b"]]  # no row-by-row retry while offline
+    status = asyncio.run(replica.status())
+    assert (status["pending_push"], status["failed_push"], status["dead_push"]) == (2, 2, 0)
+
+    upstream.down = False
+    assert asyncio.run(replica.push_outbox()) == 2
+
+
+def test_schema_upgrade_adds_new_columns(tmp_path, upstream, monkeypatch):
+    monkeypatch.setattr(replica_service.settings, "REPLICA_ENABLED", True)
+    path = str(tmp_path / "replica.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE outbox (seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, row TEXT NOT NULL,"
+        " queued_at TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT)"
+    )
+    conn.execute(replica_service.SCHEMA[0].replace("captured_at TEXT,", ""))
+    conn.commit()
+    conn.close()
+
+    replica = LocalReplica(path, sync_interval=60, pull_batch_size=100, push_batch_size=10)
+    _enqueue(replica, _result("a"))
+    assert asyncio.run(replica.status())["dead_push"] == 0
+    assert asyncio.run(replica.get_result("a"))["captured_at"] == "2020-01-01T00:00:00+00:00"
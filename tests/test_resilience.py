@@ -0,0 +1,140 @@
+import asyncio
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError, generate_default_error_message
+
+from app.core import resilience
+from app.core.resilience import (
+    CircuitBreaker,
+    UpstreamTimeoutError,
+    UpstreamUnavailableError,
+    call_supabase,
+    is_upstream_failure,
+)
+
+
+def _api_error(code: str) -> APIError:
+    return APIError({"message": "rejected", "code": code, "hint": None, "details": None})
+
+
+def _gateway_error(status: int) -> APIError:
+    # What postgrest raises for a response body that isn't PostgREST JSON
+    return APIError(generate_default_error_message(httpx.Response(status, content=b"<html>Bad Gateway</html>")))
+
+
+class _StatusError(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.mark.parametrize("exc", [
+    UpstreamTimeoutError("deadline"),
+    asyncio.TimeoutError(),
+    httpx.ConnectError("refused"),
+    httpx.ReadTimeout("slow"),
+    _StatusError(502),
+    _gateway_error(502),
+    _gateway_error(503),
+    _gateway_error(504),
+    _api_error("PGRST000"),  # could not connect to the database
+    _api_error("PGRST001"),
+    _api_error("PGRST002"),
+    _api_error("PGRST003"),  # timed out acquiring a pool connection
+    httpx.HTTPStatusError("bad gateway", request=httpx.Request("GET", "http://x"), response=httpx.Response(503)),
+])
+def test_upstream_failures(exc):
+    assert is_upstream_failure(exc)
+
+
+@pytest.mark.parametrize("exc", [
+    _api_error("23505"),  # unique_violation
+    _api_error("23503"),  # foreign_key_violation
+    _api_error("42501"),  # insufficient_privilege
+    _api_error("PGRST116"),
+    _gateway_error(404),
+    _StatusError(401),
+    _StatusError(404),
+    httpx.HTTPStatusError("not found", request=httpx.Request("GET", "http://x"), response=httpx.Response(404)),
+    ValueError("bad input"),
+])
+def test_client_errors_are_not_upstream_failures(exc):
+    assert not is_upstream_failure(exc)
+
+
+def test_breaker_opens_after_threshold_and_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    now[0] += 10
+    assert breaker.allow()  # the single half-open probe
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5)
+    breaker.record_failure()
+    now[0] += 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == 5
+
+
+@pytest.fixture
+def fresh_breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    monkeypatch.setattr(resilience, "breaker", breaker)
+    monkeypatch.setattr(resilience.settings, "SUPABASE_READ_RETRIES", 0)
+    return breaker
+
+
+def test_constraint_violations_do_not_trip_breaker(fresh_breaker):
+    def insert():
+        raise _api_error("23505")
+
+    for _ in range(5):
+        with pytest.raises(APIError):
+            asyncio.run(call_supabase("scans.insert", insert))
+    assert fresh_breaker.state == CircuitBreaker.CLOSED
+
+
+def test_transport_errors_trip_breaker(fresh_breaker):
+    def select():
+        raise httpx.ConnectError("refused")
+
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailableError):
+            asyncio.run(call_supabase("scans.select", select, idempotent=True))
+    assert fresh_breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailableError, match="circuit open"):
+        asyncio.run(call_supabase("scans.select", lambda: "unreachable", idempotent=True))
+
+
+def test_gateway_errors_trip_breaker_and_reads_retry(fresh_breaker, monkeypatch):
+    monkeypatch.setattr(resilience.settings, "SUPABASE_READ_RETRIES", 1)
+    monkeypatch.setattr(resilience.settings, "SUPABASE_RETRY_BACKOFF_SECONDS", 0.0)
+    calls = []
+
+    def select():
+        calls.append(1)
+        raise _gateway_error(503)
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(call_supabase("scans.select", select, idempotent=True))
+    assert len(calls) == 2
+    assert fresh_breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,78 @@
+import asyncio
+
+from app.services import result_feed
+from app.services.result_feed import ResultFeed, Subscription
+
+
+def _row(id, created_at, decision="disease", confidence=0.9):
+    return {"id": id, "created_at": created_at, "fusion_decision": decision, "fused_confidence": confidence}
+
+
+def test_subscription_drops_oldest_when_full():
+    subscription = Subscription(None, None, maxsize=2)
+    for i in range(3):
+        subscription.push({"id": str(i)})
+    assert subscription.take_dropped() == 1
+    assert subscription.take_dropped() == 0
+    rows = asyncio.run(subscription.next_batch(timeout=0.01))
+    assert [row["id"] for row in rows] == ["1", "2"]
+    assert asyncio.run(subscription.next_batch(timeout=0.01)) == []
+
+
+def test_subscription_filters():
+    subscription = Subscription("Disease", 0.5, maxsize=10)
+    assert subscription.matches(_row("a", "t", "disease", 0.7))
+    assert not subscription.matches(_row("b", "t", "healthy", 0.7))
+    assert not subscription.matches(_row("c", "t", "disease", 0.4))
+    assert not subscription.matches(_row("d", "t", "disease", None))
+    assert Subscription(None, None, maxsize=1).matches(_row("e", "t", None, None))
+
+
+def test_advance_skips_rows_already_sent_in_overlap():
+    feed = ResultFeed(poll_interval=1, buffer_size=10, max_subscribers=10, overlap=5)
+    feed._seed([_row("old", "2024-01-01T00:00:10+00:00")])
+
+    first = feed._advance([
+        _row("old", "2024-01-01T00:00:10+00:00"),
+        _row("a", "2024-01-01T00:00:12+00:00"),
+    ])
+    assert [row["id"] for row in first] == ["a"]
+
+    # "late" committed behind the watermark; the overlap re-read still picks it up
+    second = feed._advance([
+        _row("late", "2024-01-01T00:00:11+00:00"),
+        _row("a", "2024-01-01T00:00:12+00:00"),
+        _row("b", "2024-01-01T00:00:20+00:00"),
+    ])
+    assert [row["id"] for row in second] == ["late", "b"]
+    assert feed._watermark.isoformat() == "2024-01-01T00:00:20+00:00"
+    # Ids older than the overlap window are forgotten
+    assert set(feed._seen) == {"b"}
+
+
+def test_poll_reads_behind_watermark_and_state_changes_on_loop(monkeypatch):
+    feed = ResultFeed(poll_interval=1, buffer_size=10, max_subscribers=10, overlap=5)
+    calls = []
+
+    def fetch_since(since):
+        calls.append(since)
+        assert feed._watermark.isoformat() == "2024-01-01T00:00:10+00:00"
+        return [_row("seed", "2024-01-01T00:00:10+00:00"), _row("new", "2024-01-01T00:00:11+00:00")]
+
+    async def fake_call_supabase(operation, fn, *, idempotent=False, timeout=None):
+        return fn()
+
+    monkeypatch.setattr(result_feed, "call_supabase", fake_call_supabase)
+    monkeypatch.setattr(feed, "_fetch_since", fetch_since)
+
+    async def run():
+        subscription = feed.subscribe(None, None)
+        feed._poller.cancel()
+        feed._seed([_row("seed", "2024-01-01T00:00:10+00:00")])
+        await feed._poll_once()
+        return await subscription.next_batch(timeout=0.01)
+
+    rows = asyncio.run(run())
+    assert [row["id"] for row in rows] == ["new"]
+    assert calls[0].isoformat() == "2024-01-01T00:00:05+00:00"
+    assert feed._watermark.isoformat() == "2024-01-01T00:00:11+00:00"
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import Principal
+from app.core.storage import LocalStorageBackend
+from app.services import scan_service
+
+BOUNDARY = "scanboundary"
+
+
+def _part(name: str, data: bytes, filename: str = "") -> bytes:
+    disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + b"\r\n"
+
+
+class _Request:
+    def __init__(self, chunks, fail_after=None):
+        self.headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+        self._chunks = chunks
+        self._fail_after = fail_after
+
+    async def stream(self):
+        for i, chunk in enumerate(self._chunks):
+            if self._fail_after is not None and i == self._fail_after:
+                raise ConnectionResetError("client went away")
+            yield chunk
+
+
+@pytest.fixture
+def storage_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(scan_service, "storage", LocalStorageBackend(str(tmp_path)))
+    return tmp_path
+
+
+def _spooled(root):
+    return list((root / ".incoming").glob("*.part")) if (root / ".incoming").exists() else []
+
+
+FARMER = Principal(id="farmer-1", email="farmer@example.com", role="farmer")
+
+
+def _upload(request, principal=FARMER):
+    return asyncio.run(scan_service.stream_scan_upload(request, principal))
+
+
+def test_truncated_body_aborts_open_part(storage_root):
+    # The thermal part is cut off mid-data; finalize() doesn't raise on that
+    body = _part("normal_image", b"a" * 100, "n.jpg") + _part("thermal_image", b"b" * 100, "t.jpg")[:-40]
+    with pytest.raises(HTTPException) as info:
+        _upload(_Request([body]))
+    assert info.value.status_code == 400
+    assert "thermal_image" in info.value.detail
+    assert _spooled(storage_root) == []
+
+
+def test_oversized_image_aborts(storage_root, monkeypatch):
+    monkeypatch.setattr(scan_service.settings, "UPLOAD_MAX_IMAGE_BYTES", 50)
+    body = _part("normal_image", b"a" * 100, "n.jpg")
+    with pytest.raises(HTTPException) as info:
+        _upload(_Request([body[:80], body[80:]]))
+    assert info.value.status_code == 413
+    assert _spooled(storage_root) == []
+
+
+def test_client_disconnect_aborts(storage_root):
+    body = _part("normal_image", b"a" * 100, "n.jpg")
+    with pytest.raises(HTTPException) as info:
+        _upload(_Request([body[:80], body[80:]], fail_after=1))
+    assert info.value.status_code == 400
+    assert _spooled(storage_root) == []
+
+
+def test_complete_upload_creates_scan(storage_root, monkeypatch):
+    inserted = []
+
+    async def fake_call_supabase(operation, fn, **kwargs):
+        inserted.append(operation)
+        return SimpleNamespace(data=[{"id": "scan-1"}], error=None)
+
+    monkeypatch.setattr(scan_service, "call_supabase", fake_call_supabase)
+    body = (
+        _part("normal_image", b"a" * 100, "n.jpg")
+        + _part("thermal_image", b"b" * 100, "t.png")
+        + _part("device_id", b"device-1")
+        + f"--{BOUNDARY}--\r\n".encode()
+    )
+    result = _upload(_Request([body[i:i + 64] for i in range(0, len(body), 64)]))
+    assert inserted == ["scans.insert"]
+    assert result["scan"] == {"id": "scan-1"}
+    assert result["images"]["normal_image"]["size"] == 100
+    assert result["images"]["thermal_image"]["path"].endswith(".png")
+    assert (storage_root / result["images"]["normal_image"]["path"]).exists()
+    assert _spooled(storage_root) == []
+
+
+@pytest.mark.parametrize("principal, farmer_id", [
+    (FARMER, "farmer-1"),
+    (Principal(id="admin-1", email=None, role="admin"), "someone-else"),
+])
+def test_only_admins_choose_farmer_id(storage_root, monkeypatch, principal, farmer_id):
+    rows = []
+
+    class Table:
+        def insert(self, row):
+            rows.append(row)
+            return SimpleNamespace(execute=lambda: SimpleNamespace(data=[{"id": "scan-1", **row}], error=None))
+
+    async def run_now(operation, fn, **kwargs):
+        return fn()
+
+    monkeypatch.setattr(scan_service, "call_supabase", run_now)
+    monkeypatch.setattr(scan_service, "supabase_admin", SimpleNamespace(table=lambda name: Table()))
+    body = (
+        _part("normal_image", b"a" * 100, "n.jpg")
+        + _part("thermal_image", b"b" * 100, "t.png")
+        + _part("farmer_id", b"someone-else")
+        + f"--{BOUNDARY}--\r\n".encode()
+    )
+    result = _upload(_Request([body]), principal)
+    assert rows[0]["farmer_id"] == farmer_id
+    assert result["scan"]["farmer_id"] == farmer_id
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.core import cache, security
+from app.core.cache import MemoryCache
+from app.core.security import get_current_principal, invalidate_user, require_role, verify_token
+
+SECRET = "test-jwt-secret-at-least-32-bytes-long"
+REQUEST = SimpleNamespace(cookies={})
+
+
+def _token(sub="user-1", secret=SECRET, exp_in=3600, **claims):
+    payload = {"sub": sub, "aud": "authenticated", "exp": time.time() + exp_in, **claims}
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def caches(monkeypatch):
+    monkeypatch.setattr(security, "_token_cache", MemoryCache(ttl=60))
+    monkeypatch.setattr(security, "_role_cache", MemoryCache(ttl=60))
+    monkeypatch.setattr(security, "_revoked_users", MemoryCache(ttl=3600))
+    monkeypatch.setattr(security.settings, "SUPABASE_JWT_SECRET", SECRET)
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    """profiles.role lookups served from a dict."""
+    rows = {}
+
+    async def get_profile_role(user_id):
+        return rows.get(user_id)
+
+    monkeypatch.setattr(security, "get_profile_role", get_profile_role)
+    return rows
+
+
+def _principal(token):
+    return asyncio.run(get_current_principal(REQUEST, token))
+
+
+def _require(token, *roles):
+    return asyncio.run(require_role(*roles)(_principal(token)))
+
+
+def test_admin_role_comes_from_app_metadata(profiles):
+    profiles["user-1"] = "farmer"
+    token = _token(app_metadata={"role": "admin"})
+    assert _require(token, "admin").role == "admin"
+
+
+@pytest.mark.parametrize("claims", [
+    {"user_metadata": {"role": "admin"}},  # writable by the user through sign_up / update_user
+    {"role": "admin"},
+    {},
+])
+def test_forged_admin_role_is_rejected(profiles, claims):
+    profiles["user-1"] = "admin"  # users can update their own profile row
+    token = _token(**claims)
+    assert _principal(token).role == "farmer"
+    with pytest.raises(HTTPException) as info:
+        _require(token, "admin")
+    assert info.value.status_code == 403
+
+
+def test_token_signed_with_other_secret_is_rejected(profiles):
+    with pytest.raises(HTTPException) as info:
+        _principal(_token(secret="forged-secret-at-least-32-bytes-long", app_metadata={"role": "admin"}))
+    assert info.value.status_code == 401
+
+
+def test_user_without_profile_is_forbidden(profiles):
+    with pytest.raises(HTTPException) as info:
+        _principal(_token())
+    assert info.value.status_code == 403
+
+
+def test_deleted_user_token_is_revoked(profiles):
+    profiles["user-1"] = "farmer"
+    token = _token()
+    assert _principal(token).id == "user-1"
+    invalidate_user("user-1", deleted=True)
+    with pytest.raises(HTTPException) as info:
+        _principal(token)
+    assert info.value.status_code == 401
+
+
+def test_token_cache_respects_ttl_and_expiry(monkeypatch):
+    monkeypatch.setattr(security.settings, "SUPABASE_JWT_SECRET", None)
+    monkeypatch.setattr(security.settings, "AUTH_TOKEN_CACHE_SECONDS", 60.0)
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    calls = []
+
+    async def fake_call_supabase(operation, fn, **kwargs):
+        calls.append(operation)
+        user = SimpleNamespace(id="user-1", email="a@example.com", app_metadata={})
+        return SimpleNamespace(user=user)
+
+    monkeypatch.setattr(security, "call_supabase", fake_call_supabase)
+
+    long_lived = _token(secret="unknown-to-us-at-least-32-bytes-long")
+    asyncio.run(verify_token(long_lived))
+    asyncio.run(verify_token(long_lived))
+    assert len(calls) == 1
+    now[0] += 61
+    asyncio.run(verify_token(long_lived))
+    assert len(calls) == 2
+
+    # Never cached past the token's own expiry
+    short_lived = _token(secret="unknown-to-us-at-least-32-bytes-long", exp_in=5)
+    asyncio.run(verify_token(short_lived))
+    now[0] += 6
+    asyncio.run(verify_token(short_lived))
+    assert len(calls) == 4
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.services import soil_reading_service
+from app.services.soil_reading_service import format_buckets, lttb_downsample
+
+
+def test_lttb_keeps_endpoints_and_peak():
+    ts = np.arange(1000, dtype=np.float64)
+    values = np.zeros(1000)
+    values[437] = 50.0
+    out = lttb_downsample(ts, values, 20)
+    assert len(out["values"]) == 20
+    assert out["values"][0] == 0.0 and out["values"][-1] == 0.0
+    assert 50.0 in out["values"]
+    assert out["timestamps"] == sorted(out["timestamps"])
+
+
+def test_lttb_drops_missing_and_returns_short_series_whole():
+    ts = np.arange(5, dtype=np.float64)
+    values = np.array([1.0, np.nan, 3.0, 4.0, 5.0])
+    out = lttb_downsample(ts, values, 10)
+    assert out["values"] == [1.0, 3.0, 4.0, 5.0]
+
+
+def test_format_buckets_groups_rows_by_metric():
+    rows = [
+        [0, "ph", 6.0, 7.0, 6.5, 4],
+        [0, "moisture", 10.0, 20.0, 15.0, 2],
+        [3, "ph", 5.5, 5.5, 5.5, 1],
+        [1, "nitrogen", 1, 1, 1, 1],  # not requested
+    ]
+    series = format_buckets(rows, start=0.0, end=400.0, points=4, metrics=["ph", "moisture"])
+    assert set(series) == {"ph", "moisture"}
+    assert series["ph"]["timestamps"] == ["1970-01-01T00:00:00+00:00", "1970-01-01T00:05:00+00:00"]
+    assert series["ph"]["avg"] == [6.5, 5.5]
+    assert series["ph"]["count"] == [4, 1]
+    assert series["moisture"]["min"] == [10.0]
+
+
+@pytest.mark.parametrize("total, loaded", [(11, False), (3, True)])
+def test_raw_row_cap_checked_before_loading(monkeypatch, total, loaded):
+    queries = []
+
+    class Query:
+        def __init__(self):
+            self.count = None
+
+        def select(self, columns, count=None):
+            self.count = count
+            return self
+
+        def gte(self, *args):
+            return self
+
+        def lte(self, *args):
+            return self
+
+        def order(self, *args, **kwargs):
+            return self
+
+        def limit(self, *args):
+            return self
+
+        def execute(self):
+            queries.append(self.count)
+            if self.count == "exact":
+                return SimpleNamespace(data=[{"id": 1}], count=total, error=None)
+            return SimpleNamespace(data=[{"id": i, "reading_timestamp": "2024-01-01T00:00:00+00:00"} for i in range(total)], error=None)
+
+    async def run_now(operation, fn, **kwargs):
+        return fn()
+
+    monkeypatch.setattr(soil_reading_service, "supabase_admin", SimpleNamespace(table=lambda name: Query()))
+    monkeypatch.setattr(soil_reading_service, "call_supabase", run_now)
+    monkeypatch.setattr(soil_reading_service.settings, "SOIL_TIMESERIES_MAX_RAW_ROWS", 10)
+    start, end = datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+    if loaded:
+        rows = asyncio.run(soil_reading_service._fetch_readings(start, end, ["ph"]))
+        assert len(rows) == 3
+        assert queries == ["exact", None]
+    else:
+        with pytest.raises(HTTPException) as info:
+            asyncio.run(soil_reading_service._fetch_readings(start, end, ["ph"]))
+        assert info.value.status_code == 400
+        assert queries == ["exact"]
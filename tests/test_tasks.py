@@ -0,0 +1,57 @@
+import asyncio
+
+from app.core.cache import SQLiteCache
+from app.core.tasks import JobQueue
+
+
+def _queues(tmp_path):
+    path = str(tmp_path / "cache.db")
+    # Two queues on one shared store stand in for two worker processes
+    return (
+        JobQueue(workers=1, max_queued=10, retry_backoff=0.01, store=SQLiteCache(path, "jobs", ttl=60)),
+        JobQueue(workers=1, max_queued=10, retry_backoff=0.01, store=SQLiteCache(path, "jobs", ttl=60)),
+    )
+
+
+def test_job_status_visible_from_other_worker(tmp_path):
+    accepting, other = _queues(tmp_path)
+    seen = {}
+
+    async def work(job, total):
+        job.set_progress(0.5, "halfway")
+        seen["mid"] = other.get(job.id)
+        return {"total": total}
+
+    async def run():
+        await accepting.start()
+        job = accepting.submit("count", work, 3)
+        await accepting.shutdown(timeout=5)
+        return job.id
+
+    job_id = asyncio.run(run())
+    assert seen["mid"]["status"] == "running"
+    assert seen["mid"]["message"] == "halfway"
+    status = other.get(job_id)
+    assert status["status"] == "succeeded"
+    assert status["result"] == {"total": 3}
+    assert status["finished_at"] is not None
+    assert [s["id"] for s in other.recent()] == [job_id]
+    assert other.get("missing") is None
+
+
+def test_retries_then_fails(tmp_path):
+    accepting, other = _queues(tmp_path)
+
+    async def broken(job):
+        raise RuntimeError("boom")
+
+    async def run():
+        await accepting.start()
+        job = accepting.submit("broken", broken, max_attempts=2)
+        await accepting.shutdown(timeout=5)
+        return job.id
+
+    status = other.get(asyncio.run(run()))
+    assert status["status"] == "failed"
+    assert status["attempts"] == 2
+    assert status["error"] == "boom"